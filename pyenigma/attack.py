@@ -0,0 +1,321 @@
+import heapq
+import logging
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+from typing import NamedTuple, Optional, Sequence
+from .rotor import Rotor
+from .reflector import Reflector
+from .plugboard import MAX_CONNECTIONS, Plugboard
+from .constants import ALPHABET
+from .compiled import LETTER_TO_INDEX, scrambler_table
+from .stepping import STATE_COUNT, state_positions, stepping_table
+from .normalize import normalize_message
+from .batch import KeySpec
+from .functional import compile_config
+from .bombe import map_rotor_orders, validated_rotor_orders
+from .vectorized import HAS_NUMPY, Array
+from .exceptions import AttackInvalidMaxPairsException, AttackInvalidTopKException, AttackInvalidWorkersException
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# Candidates kept by a sweep unless asked for more or fewer
+IOC_TOP_K = 100
+
+
+class Candidate(NamedTuple):
+    # A key scored against a ciphertext, higher scores being more likely. Candidates compare by score first, so a
+    # heap of them keeps the best.
+    score: float
+    key: KeySpec
+
+
+def index_of_coincidence(letters: bytes) -> float:
+    # The chance that two letters picked from normalized ASCII letters are the same. English and German text
+    # score around 0.066 to 0.076, random letters around 0.038.
+    length = len(letters)
+    if length < 2:
+        return 0.0
+    return sum(count * (count - 1) for count in map(letters.count, ALPHABET.encode("ascii"))) / (length * (length - 1))
+
+
+def keep_top(heap: list[Candidate], candidate: Candidate, top_k: int) -> None:
+    # Add candidate to a min-heap holding at most top_k candidates, dropping the worst when it is full
+    if len(heap) < top_k:
+        heapq.heappush(heap, candidate)
+    elif candidate > heap[0]:
+        heapq.heapreplace(heap, candidate)
+
+
+def validate_top_k(top_k: int) -> None:
+    if top_k < 1:
+        raise AttackInvalidTopKException(f"Attacks must keep at least 1 candidate. Got top_k {top_k}.")
+
+
+def validate_workers(workers: Optional[int]) -> None:
+    if workers is not None and workers < 1:
+        raise AttackInvalidWorkersException(f"Number of workers must be at least 1. Got {workers}.")
+
+
+def validate_max_pairs(max_pairs: int) -> None:
+    if not 0 <= max_pairs <= MAX_CONNECTIONS:
+        raise AttackInvalidMaxPairsException(
+            f"Plugboard searches must allow 0 to {MAX_CONNECTIONS} pairs. Got max_pairs {max_pairs}.")
+
+
+def _order_key(rotor_order: Sequence[str], reflector_model: str, ring_settings: Sequence[str], state: int) -> KeySpec:
+    left, middle, right = (ALPHABET[position] for position in state_positions(state))
+    return KeySpec((rotor_order[0], rotor_order[1], rotor_order[2]), reflector_model,
+                   (ring_settings[0], ring_settings[1], ring_settings[2]), (left, middle, right))
+
+
+def _ioc_scores(ciphertext: bytes, next_state: tuple[int, ...], table: bytes) -> list[float]:
+    # The index of coincidence of the decryption from every start state, one letter index at a time
+    length = len(ciphertext)
+    pairs = length * (length - 1) or 1
+    scores = []
+    plaintext = bytearray(length)
+    for start in range(STATE_COUNT):
+        state = start
+        for i, index in enumerate(ciphertext):
+            state = next_state[state]
+            plaintext[i] = table[state * 26 + index]
+        scores.append(sum(count * (count - 1) for count in map(plaintext.count, range(26))) / pairs)
+    return scores
+
+
+def _ioc_scores_vectorized(ciphertext: bytes, next_state: tuple[int, ...], table: bytes) -> Array:
+    # The same scores, with the decryptions from all start states stepped together as arrays
+    length = len(ciphertext)
+    steps = np.array(next_state, dtype=np.intp)
+    rows = np.frombuffer(table, dtype=np.uint8)
+    states = np.arange(STATE_COUNT, dtype=np.intp)
+    offsets = states * 26
+    counts = np.zeros(STATE_COUNT * 26, dtype=np.int64)
+    for index in ciphertext:
+        states = steps[states]
+        counts[offsets + rows[states * 26 + index]] += 1
+    letter_counts = counts.reshape(STATE_COUNT, 26)
+    return (letter_counts * (letter_counts - 1)).sum(axis=1) / (length * (length - 1) or 1)
+
+
+def score_rotor_order(
+    ciphertext: bytes,
+    rotor_order: Sequence[str],
+    reflector_model: str = "B",
+    ring_settings: Sequence[str] = ("A", "A", "A"),
+    top_k: int = IOC_TOP_K,
+) -> list[Candidate]:
+    # Decipher letter indices (A=0) from every start position of one rotor order with no plugboard connections,
+    # returning the top_k keys by index of coincidence, best first. Uses NumPy when it is installed.
+    validate_top_k(top_k)
+    rotors = [Rotor.get_rotor(model, ring_setting) for model, ring_setting in zip(rotor_order, ring_settings)]
+    next_state = stepping_table(rotors[1].notch, rotors[2].notch)
+    table = scrambler_table(rotors, Reflector.get_reflector(reflector_model))
+
+    if HAS_NUMPY:
+        scores = _ioc_scores_vectorized(ciphertext, next_state, table)
+        best = np.argpartition(-scores, top_k - 1)[:top_k] if top_k < STATE_COUNT else np.arange(STATE_COUNT)
+        candidates = [(float(scores[state]), int(state)) for state in best]
+    else:
+        candidates = [(score, state) for state, score in enumerate(_ioc_scores(ciphertext, next_state, table))]
+
+    heap: list[Candidate] = []
+    for score, state in candidates:
+        keep_top(heap, Candidate(score, _order_key(rotor_order, reflector_model, ring_settings, state)), top_k)
+    return sorted(heap, reverse=True)
+
+
+# Ciphertext letter indices used by ioc_sweep worker processes, set once per worker by the pool initializer
+_sweep_worker_ciphertext = b""
+
+
+def _init_sweep_worker(ciphertext: bytes) -> None:
+    global _sweep_worker_ciphertext
+    _sweep_worker_ciphertext = ciphertext
+
+
+def _score_rotor_order_task(args: tuple[tuple[str, ...], str, tuple[str, ...], int]) -> list[Candidate]:
+    return score_rotor_order(_sweep_worker_ciphertext, *args)
+
+
+def ioc_sweep(
+    ciphertext: str,
+    orders: Optional[Sequence[Sequence[str]]] = None,
+    reflector_model: str = "B",
+    ring_settings: Sequence[str] = ("A", "A", "A"),
+    top_k: int = IOC_TOP_K,
+    workers: Optional[int] = None,
+) -> list[Candidate]:
+    # Score every start position of every rotor order (all 60 orders of rotors I-V by default) by the index of
+    # coincidence of its decryption with no plugboard connections, and return the top_k keys, best first. The
+    # ring settings are fixed, and the plugboard is left for a later stage to search. Rotor orders are spread
+    # over a pool of worker processes, which each get the ciphertext once.
+    validate_top_k(top_k)
+    validate_workers(workers)
+    letters = normalize_message(ciphertext).encode("ascii").translate(LETTER_TO_INDEX)
+    tasks = [(order, reflector_model, tuple(ring_settings), top_k) for order in validated_rotor_orders(orders)]
+
+    heap: list[Candidate] = []
+    for candidates in map_rotor_orders(_score_rotor_order_task, tasks, workers, _init_sweep_worker, (letters,)):
+        for candidate in candidates:
+            keep_top(heap, candidate, top_k)
+    return sorted(heap, reverse=True)
+
+
+# Random restarts of the plugboard search unless asked for more or fewer
+PLUGBOARD_RESTARTS = 8
+
+# A change must raise the score by more than this to be kept, so rounding does not make the search cycle
+_MIN_IMPROVEMENT = 1e-12
+
+
+class PlugboardClimber():
+    # Hill climbs the plugboard for one key by the index of coincidence of the decryption. The plugboard on the way
+    # out of the scrambler only relabels plaintext letters, which leaves the index of coincidence unchanged, so a
+    # plugboard's score depends only on the letter each ciphertext letter enters the scrambler as. For every
+    # ciphertext letter and entry letter, the counts of scrambler outputs over the positions holding that
+    # ciphertext letter are precomputed from the per-position permutations, and a plugboard change rescores only
+    # the ciphertext letters it reconnects.
+    def __init__(self, ciphertext: str, key: KeySpec) -> None:
+        config, state = compile_config(key._replace(plugboard=""))
+        letters = normalize_message(ciphertext).encode("ascii").translate(LETTER_TO_INDEX)
+        self.key = key
+        self.pairs = len(letters) * (len(letters) - 1) or 1
+        self._counts = [[[0] * 26 for _ in range(26)] for _ in range(26)]
+        for index in letters:
+            state = config.next_state[state]
+            counts = self._counts[index]
+            for entry, output in enumerate(config.table[state * 26:state * 26 + 26]):
+                counts[entry][output] += 1
+
+    def _totals(self, wiring: bytes) -> list[int]:
+        # The count of each scrambler output letter under a plugboard wiring
+        totals = [0] * 26
+        for index, entry in enumerate(wiring):
+            for output, count in enumerate(self._counts[index][entry]):
+                totals[output] += count
+        return totals
+
+    def _rescore(self, totals: list[int], old_wiring: bytes, new_wiring: bytes) -> list[int]:
+        totals = totals.copy()
+        for index in range(26):
+            if old_wiring[index] != new_wiring[index]:
+                for output, (removed, added) in enumerate(zip(self._counts[index][old_wiring[index]],
+                                                              self._counts[index][new_wiring[index]])):
+                    totals[output] += added - removed
+        return totals
+
+    def _score(self, totals: list[int]) -> float:
+        return sum(count * (count - 1) for count in totals) / self.pairs
+
+    def score(self, plugboard: Plugboard) -> float:
+        return self._score(self._totals(plugboard.wiring()))
+
+    @staticmethod
+    def _moves(plugboard: Plugboard, letter1: str, letter2: str, max_pairs: int) -> list[list[tuple[str, tuple[str, ...]]]]:
+        # The plugboard changes that connect or disconnect letter1 and letter2, each a list of (Plugboard method,
+        # arguments) calls that undo reverts one at a time
+        connections = plugboard.connections
+        plugged1 = connections.get(letter1)
+        plugged2 = connections.get(letter2)
+        if plugged1 == letter2:
+            return [[("unswap", (letter1,))]]
+        if plugged1 is None and plugged2 is None:
+            return [[("swap", (letter1, letter2))]] if len(connections) < 2 * max_pairs else []
+        if plugged2 is None:
+            assert plugged1 is not None
+            return [[("replace_pair", (letter1, letter1, letter2))], [("replace_pair", (letter1, plugged1, letter2))]]
+        if plugged1 is None:
+            return [[("replace_pair", (letter2, letter2, letter1))], [("replace_pair", (letter2, plugged2, letter1))]]
+        return [
+            [("unswap", (letter2,)), ("replace_pair", (letter1, letter1, letter2)), ("swap", (plugged1, plugged2))],
+            [("unswap", (letter2,)), ("replace_pair", (letter1, letter1, plugged2)), ("swap", (plugged1, letter2))],
+        ]
+
+    def climb(self, plugboard: Plugboard, max_pairs: int = MAX_CONNECTIONS, rng: Optional[random.Random] = None) -> float:
+        # Change the plugboard a pair of letters at a time, keeping each change that raises the score, until no
+        # change does. Returns the final score. Letter pairs are tried in a random order when rng is given.
+        wiring = plugboard.wiring()
+        totals = self._totals(wiring)
+        score = self._score(totals)
+        letter_pairs = list(combinations(ALPHABET, 2))
+        improved = True
+        while improved:
+            improved = False
+            if rng is not None:
+                rng.shuffle(letter_pairs)
+            for letter1, letter2 in letter_pairs:
+                for move in self._moves(plugboard, letter1, letter2, max_pairs):
+                    for method, args in move:
+                        getattr(plugboard, method)(*args)
+                    new_wiring = plugboard.wiring()
+                    new_totals = self._rescore(totals, wiring, new_wiring)
+                    new_score = self._score(new_totals)
+                    if new_score > score + _MIN_IMPROVEMENT:
+                        wiring, totals, score = new_wiring, new_totals, new_score
+                        improved = True
+                        break
+                    for _ in move:
+                        plugboard.undo()
+                plugboard.clear_undo()
+        return score
+
+    def restart(self, restart: int, max_pairs: int = MAX_CONNECTIONS, seed: int = 0) -> Candidate:
+        # Climb from a random plugboard (the empty plugboard for restart 0), returning the key with the plugboard found
+        validate_max_pairs(max_pairs)
+        rng = random.Random(seed * 1_000_003 + restart)
+        pairs: list[tuple[int, int]] = []
+        if restart and max_pairs:
+            letters = rng.sample(range(26), 2 * rng.randint(1, max_pairs))
+            pairs = list(zip(letters[::2], letters[1::2]))
+        plugboard = Plugboard.from_pairs(pairs)
+        score = self.climb(plugboard, max_pairs, rng if restart else None)
+        connection_string = " ".join(
+            ALPHABET[index] + ALPHABET[plugged] for index, plugged in enumerate(plugboard.wiring()) if index < plugged
+        )
+        return Candidate(score, self.key._replace(plugboard=connection_string))
+
+
+# Climber used by solve_plugboard worker processes, set once per worker by the pool initializer
+_climb_worker_climber: Optional[PlugboardClimber] = None
+
+
+def _init_climb_worker(climber: PlugboardClimber) -> None:
+    global _climb_worker_climber
+    _climb_worker_climber = climber
+
+
+def _climb_task(args: tuple[int, int, int]) -> Candidate:
+    assert _climb_worker_climber is not None
+    return _climb_worker_climber.restart(*args)
+
+
+def solve_plugboard(
+    ciphertext: str,
+    key: KeySpec,
+    restarts: int = PLUGBOARD_RESTARTS,
+    max_pairs: int = MAX_CONNECTIONS,
+    seed: int = 0,
+    workers: Optional[int] = None,
+) -> Candidate:
+    # Search for the plugboard of a key whose rotor order, ring settings and positions are known (such as a
+    # candidate from ioc_sweep), hill climbing from the empty plugboard and restarts - 1 random plugboards and
+    # returning the best key found. Restarts are spread over a pool of worker processes, which each get the
+    # precomputed counts once. The same seed gives the same result.
+    validate_max_pairs(max_pairs)
+    validate_workers(workers)
+    climber = PlugboardClimber(ciphertext, key)
+    tasks = [(restart, max_pairs, seed) for restart in range(max(1, restarts))]
+
+    workers = workers or os.cpu_count() or 1
+    logger.debug(f"Climbing {len(tasks)} plugboards across {workers} processes")
+    if workers <= 1 or len(tasks) <= 1:
+        return max(climber.restart(*task) for task in tasks)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_climb_worker, initargs=(climber,)) as pool:
+        return max(pool.map(_climb_task, tasks))
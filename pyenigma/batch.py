@@ -0,0 +1,82 @@
+import logging
+from collections import Counter
+from typing import NamedTuple, Sequence
+from .rotor import Rotor
+from .reflector import Reflector
+from .plugboard import Plugboard
+from .normalize import normalize_message, log_removed
+from .compiled import Scrambler, plugboard_tables, scrambler_table
+from .stepping import state_id, stepping_table
+from .exceptions import EnigmaMachineBatchSizeMismatchException
+
+
+logger = logging.getLogger(__name__)
+
+# Groups with at least this many letters compile the full scrambler table up front instead of building the
+# permutation of each state the first time it is used
+FULL_TABLE_MIN_LETTERS = 20_000
+
+
+class KeySpec(NamedTuple):
+    rotors: tuple[str, str, str]
+    reflector: str
+    ring_settings: tuple[str, str, str] = ("A", "A", "A")
+    positions: tuple[str, str, str] = ("A", "A", "A")
+    plugboard: str = ""
+
+
+def _plugboard_tables(connection_string: str) -> tuple[bytes, bytes]:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(connection_string)
+    return plugboard_tables(plugboard)
+
+
+def encipher_many(keys: Sequence[KeySpec], messages: Sequence[str]) -> list[str]:
+    # Encipher each message under its own key. Keys sharing rotors, ring settings and reflector are grouped so
+    # they share rotor tables, stepping table and scrambler permutations; the plugboard and start positions are
+    # applied per message.
+    if len(keys) != len(messages):
+        raise EnigmaMachineBatchSizeMismatchException(f"Got {len(keys)} keys for {len(messages)} messages")
+
+    groups: dict[tuple[tuple[str, ...], tuple[str, ...], str], list[int]] = {}
+    for index, key in enumerate(keys):
+        groups.setdefault((tuple(key.rotors), tuple(key.ring_settings), key.reflector), []).append(index)
+
+    plugboard_cache: dict[str, tuple[bytes, bytes]] = {}
+    removed: Counter[str] = Counter()
+    results = [""] * len(messages)
+    for (rotor_models, ring_settings, reflector_model), indices in groups.items():
+        rotors = [Rotor.get_rotor(model, ring_setting) for model, ring_setting in zip(rotor_models, ring_settings)]
+        reflector = Reflector.get_reflector(reflector_model)
+        next_state = stepping_table(rotors[1].notch, rotors[2].notch)
+
+        normalized = {index: normalize_message(messages[index], removed) for index in indices}
+        use_full_table = sum(len(message) for message in normalized.values()) >= FULL_TABLE_MIN_LETTERS
+        # Large groups use the full table, shared with compiled machines through the compiled table cache. Small
+        # groups build the rows of the states they reach.
+        if use_full_table:
+            table = scrambler_table(rotors, reflector)
+        else:
+            row = Scrambler(rotors, reflector).row
+
+        for index in indices:
+            key = keys[index]
+            if key.plugboard not in plugboard_cache:
+                plugboard_cache[key.plugboard] = _plugboard_tables(key.plugboard)
+            plug_in, plug_out = plugboard_cache[key.plugboard]
+            state = state_id(*(Rotor._letter_to_index(position) for position in key.positions))
+
+            encrypted = bytearray(normalized[index].encode("ascii").translate(plug_in))
+            if use_full_table:
+                for i, letter in enumerate(encrypted):
+                    state = next_state[state]
+                    encrypted[i] = table[state * 26 + letter]
+            else:
+                for i, letter in enumerate(encrypted):
+                    state = next_state[state]
+                    encrypted[i] = row(state)[letter]
+            results[index] = encrypted.translate(plug_out).decode("ascii")
+
+        logger.debug(f"Enciphered {len(indices)} messages with rotors {rotor_models}, reflector {reflector_model}")
+    log_removed(removed)
+    return results
@@ -0,0 +1,4 @@
+from .cases import BENCHMARKS, Benchmark, benchmark
+from .runner import main, run_benchmarks
+
+__all__ = ["BENCHMARKS", "Benchmark", "benchmark", "main", "run_benchmarks"]
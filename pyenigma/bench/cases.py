@@ -0,0 +1,336 @@
+import io
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from ..machine import EnigmaMachine
+from ..rotor import Rotor
+from ..reflector import Reflector
+from ..plugboard import Plugboard
+from ..batch import KeySpec, encipher_many
+from ..constants import ALPHABET
+from ..compiled import COMPILED_TABLE_CACHE, LETTER_TO_INDEX
+from ..attack import PlugboardClimber, score_rotor_order
+from ..ngrams import NgramModel
+from ..evaluate import evaluate_keys
+from ..bombe import build_menu, sweep_rotor_order
+from .. import functional, vectorized
+
+
+# A benchmark factory does the untimed setup for a message size (None for benchmarks that do not take a
+# message) and returns the call to time. A call with a close method has it called once the benchmark is done.
+Factory = Callable[[Optional[int]], Callable[[], object]]
+
+# Taking each random byte modulo 26 is slightly uneven, which does not matter for timing
+_RANDOM_LETTERS = bytes(ord(ALPHABET[code % 26]) for code in range(256))
+
+# Plugboard connections used by every benchmark machine
+BENCH_PLUGBOARD = "AV BS CG DL FU HZ IN KM OW RX"
+
+# Length of each message in the encipher_many benchmark
+BATCH_MESSAGE_LENGTH = 100
+
+
+class Benchmark():
+    # A named benchmark. Sized benchmarks are run for each message size up to max_size, the others once per run.
+    # Benchmarks that are not available (for example because NumPy is not installed) are skipped.
+    def __init__(self, name: str, factory: Factory, sized: bool = True, max_size: Optional[int] = None,
+                 available: bool = True) -> None:
+        self.name = name
+        self.factory = factory
+        self.sized = sized
+        self.max_size = max_size
+        self.available = available
+
+
+class ThreadPoolCall():
+    # A benchmark call that runs on a thread pool it owns. The pool is started once, so starting threads is not
+    # timed, and the runner calls close when the benchmark is done so the threads do not outlive it.
+    def __init__(self, workers: int, call: Callable[[ThreadPoolExecutor], object]) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._call = call
+
+    def __call__(self) -> object:
+        return self._call(self._pool)
+
+    def close(self) -> None:
+        self._pool.shutdown()
+
+
+# All benchmarks by name, in the order they are run
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, sized: bool = True, max_size: Optional[int] = None,
+              available: bool = True) -> Callable[[Factory], Factory]:
+    # Register a benchmark factory under name
+    def register(factory: Factory) -> Factory:
+        BENCHMARKS[name] = Benchmark(name, factory, sized, max_size, available)
+        return factory
+    return register
+
+
+def sample_letters(size: int, seed: int = 0) -> bytes:
+    # Random uppercase letters as ASCII bytes, the same for every run
+    return random.Random(seed).randbytes(size).translate(_RANDOM_LETTERS)
+
+
+def sample_message(size: Optional[int]) -> str:
+    assert size is not None
+    return sample_letters(size).decode("ascii")
+
+
+def build_machine(compiled: bool = False) -> EnigmaMachine:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(BENCH_PLUGBOARD)
+    machine = EnigmaMachine()
+    machine.set_rotors([Rotor.get_rotor_IV("B", "Q"), Rotor.get_rotor_II("R", "E"), Rotor.get_rotor_V("E", "V")])
+    machine.set_reflector(Reflector.get_reflector_B())
+    machine.set_plugboard(plugboard)
+    if compiled:
+        machine.compile()
+    return machine
+
+
+@benchmark("encipher", max_size=10_000_000)
+def bench_encipher(size: Optional[int]) -> Callable[[], object]:
+    # The public API on an uncompiled machine, which picks the per-letter or NumPy path by itself
+    machine = build_machine()
+    message = sample_message(size)
+    return lambda: machine.encipher(message)
+
+
+@benchmark("encipher_compiled")
+def bench_encipher_compiled(size: Optional[int]) -> Callable[[], object]:
+    machine = build_machine(compiled=True)
+    message = sample_message(size)
+    return lambda: machine.encipher(message)
+
+
+@benchmark("path_per_letter", max_size=1_000_000)
+def bench_path_per_letter(size: Optional[int]) -> Callable[[], object]:
+    # The encipher paths on their own, without normalization and whatever the message length
+    machine = build_machine()
+    letters = sample_letters(size or 0)
+    return lambda: machine._encipher_by_path("per_letter", letters)
+
+
+@benchmark("path_compiled")
+def bench_path_compiled(size: Optional[int]) -> Callable[[], object]:
+    machine = build_machine(compiled=True)
+    letters = sample_letters(size or 0)
+    return lambda: machine._encipher_by_path("compiled", letters)
+
+
+@benchmark("path_vectorized", available=vectorized.HAS_NUMPY)
+def bench_path_vectorized(size: Optional[int]) -> Callable[[], object]:
+    machine = build_machine()
+    letters = sample_letters(size or 0)
+    return lambda: machine._encipher_by_path("vectorized", letters)
+
+
+@benchmark("path_vectorized_compiled", available=vectorized.HAS_NUMPY)
+def bench_path_vectorized_compiled(size: Optional[int]) -> Callable[[], object]:
+    machine = build_machine(compiled=True)
+    letters = sample_letters(size or 0)
+    return lambda: machine._encipher_by_path("vectorized", letters)
+
+
+@benchmark("encipher_parallel")
+def bench_encipher_parallel(size: Optional[int]) -> Callable[[], object]:
+    # Messages shorter than PARALLEL_MIN_CHUNK_SIZE are enciphered in the calling process
+    machine = build_machine(compiled=True)
+    message = sample_message(size)
+    return lambda: machine.encipher_parallel(message, workers=os.cpu_count())
+
+
+@benchmark("functional_encipher")
+def bench_functional_encipher(size: Optional[int]) -> Callable[[], object]:
+    config = build_machine().to_config()
+    message = sample_message(size)
+    return lambda: functional.encipher(config, message, 0)
+
+
+@benchmark("functional_threads")
+def bench_functional_threads(size: Optional[int]) -> Callable[[], object]:
+    # The message is split into one message per thread, all sharing one config
+    config = build_machine().to_config()
+    message = sample_message(size)
+    workers = os.cpu_count() or 1
+    length = -(-len(message) // workers)
+    messages = [message[offset:offset + length] for offset in range(0, len(message), length)]
+    return ThreadPoolCall(workers, lambda pool: list(pool.map(lambda part: functional.encipher(config, part, 0), messages)))
+
+
+@benchmark("encipher_stream")
+def bench_encipher_stream(size: Optional[int]) -> Callable[[], object]:
+    machine = build_machine(compiled=True)
+    message = sample_message(size)
+    return lambda: machine.encipher_stream(io.StringIO(message), io.StringIO())
+
+
+@benchmark("encipher_into")
+def bench_encipher_into(size: Optional[int]) -> Callable[[], object]:
+    machine = build_machine(compiled=True)
+    letters = sample_letters(size or 0)
+    output = bytearray(len(letters))
+    return lambda: machine.encipher_into(letters, output)
+
+
+@benchmark("encipher_many")
+def bench_encipher_many(size: Optional[int]) -> Callable[[], object]:
+    # The message is split into messages of BATCH_MESSAGE_LENGTH letters, each under one of ten daily keys
+    message = sample_message(size)
+    messages = [message[offset:offset + BATCH_MESSAGE_LENGTH] for offset in range(0, len(message), BATCH_MESSAGE_LENGTH)]
+    rotor_orders = [("I", "II", "III"), ("IV", "II", "V"), ("III", "I", "IV"), ("V", "IV", "I"), ("II", "V", "III")]
+    keys = [
+        KeySpec(rotors=rotor_orders[index % 5], reflector="B", positions=("A", "B", ALPHABET[index % 26]),
+                plugboard=BENCH_PLUGBOARD if index % 2 else "")
+        for index in range(len(messages))
+    ]
+    return lambda: encipher_many(keys, messages)
+
+
+@benchmark("rotor_get_rotor", sized=False)
+def bench_rotor_get_rotor(size: Optional[int]) -> Callable[[], object]:
+    return lambda: Rotor.get_rotor("IV", ring_setting="B", initial_rotor_position="Q")
+
+
+@benchmark("rotor_from_indices", sized=False)
+def bench_rotor_from_indices(size: Optional[int]) -> Callable[[], object]:
+    return lambda: Rotor.from_indices("IV", 1, 16)
+
+
+@benchmark("reflector_get_reflector", sized=False)
+def bench_reflector_get_reflector(size: Optional[int]) -> Callable[[], object]:
+    return lambda: Reflector.get_reflector("B")
+
+
+@benchmark("plugboard_add_connection_from_string", sized=False)
+def bench_plugboard_add_connection_from_string(size: Optional[int]) -> Callable[[], object]:
+    return lambda: Plugboard().add_connection_from_string(BENCH_PLUGBOARD)
+
+
+@benchmark("plugboard_from_pairs", sized=False)
+def bench_plugboard_from_pairs(size: Optional[int]) -> Callable[[], object]:
+    pairs = [(index, index + 1) for index in range(0, 20, 2)]
+    return lambda: Plugboard.from_pairs(pairs)
+
+
+@benchmark("machine_construct", sized=False)
+def bench_machine_construct(size: Optional[int]) -> Callable[[], object]:
+    return build_machine
+
+
+@benchmark("machine_compile", sized=False)
+def bench_machine_compile(size: Optional[int]) -> Callable[[], object]:
+    # Compiling a configuration that is not in the compiled table cache
+    machine = build_machine()
+
+    def compile_uncached() -> None:
+        COMPILED_TABLE_CACHE.clear()
+        machine.compile()
+    return compile_uncached
+
+
+@benchmark("compiled_plugboard_change", sized=False)
+def bench_compiled_plugboard_change(size: Optional[int]) -> Callable[[], object]:
+    # Swapping the plugboard of a compiled machine and enciphering a short message, as a plugboard search does
+    machine = build_machine(compiled=True)
+    plugboards = [Plugboard(), machine.plugboard]
+    plugboards[0].add_connection_from_string("QW ER TY")
+    swaps = [0]
+
+    def change_and_encipher() -> str:
+        swaps[0] += 1
+        machine.set_plugboard(plugboards[swaps[0] % 2])
+        return machine.encipher("HELLOWORLD")
+    return change_and_encipher
+
+
+@benchmark("plugboard_replace_pair_undo", sized=False)
+def bench_plugboard_replace_pair_undo(size: Optional[int]) -> Callable[[], object]:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(BENCH_PLUGBOARD)
+
+    def replace_and_undo() -> None:
+        plugboard.replace_pair("A", "A", "E")
+        plugboard.undo()
+    return replace_and_undo
+
+
+@benchmark("machine_compile_cached", sized=False)
+def bench_machine_compile_cached(size: Optional[int]) -> Callable[[], object]:
+    # Building and compiling a fresh machine for a configuration already in the compiled table cache
+    return lambda: build_machine(compiled=True)
+
+
+@benchmark("bombe_rotor_order", sized=False, available=vectorized.HAS_NUMPY)
+def bench_bombe_rotor_order(size: Optional[int]) -> Callable[[], object]:
+    # Testing all 17,576 start positions of one rotor order against a 23 letter crib
+    machine = build_machine()
+    crib = "WETTERVORHERSAGEBISKAYA"
+    menu = build_menu(machine.encipher(crib), crib, 0)
+    return lambda: sweep_rotor_order(menu, ("IV", "II", "V"), ring_settings=("B", "R", "E"))
+
+
+@benchmark("ioc_rotor_order", max_size=10_000)
+def bench_ioc_rotor_order(size: Optional[int]) -> Callable[[], object]:
+    # Scoring all 17,576 start positions of one rotor order by index of coincidence
+    letters = sample_letters(size or 0).translate(LETTER_TO_INDEX)
+    return lambda: score_rotor_order(letters, ("IV", "II", "V"), ring_settings=("B", "R", "E"))
+
+
+@benchmark("plugboard_climb", sized=False)
+def bench_plugboard_climb(size: Optional[int]) -> Callable[[], object]:
+    # One hill climb from the empty plugboard over 300 letters
+    key = KeySpec(("IV", "II", "V"), "B", ("B", "R", "E"), ("Q", "E", "V"))
+    climber = PlugboardClimber(sample_message(300), key)
+    return lambda: climber.climb(Plugboard())
+
+
+def _bench_ngram_model() -> NgramModel:
+    # A quadgram model counted from random letters, which scores as fast as one from real text
+    return NgramModel.build([sample_message(100_000)], 4)
+
+
+@benchmark("ngram_score")
+def bench_ngram_score(size: Optional[int]) -> Callable[[], object]:
+    model = _bench_ngram_model()
+    letters = sample_letters(size or 0).translate(LETTER_TO_INDEX)
+    return lambda: model.score_indices(letters)
+
+
+@benchmark("ngram_score_batch")
+def bench_ngram_score_batch(size: Optional[int]) -> Callable[[], object]:
+    # The message is split into texts of BATCH_MESSAGE_LENGTH letters, scored in one call
+    model = _bench_ngram_model()
+    letters = sample_letters(size or 0).translate(LETTER_TO_INDEX)
+    texts = [letters[offset:offset + BATCH_MESSAGE_LENGTH] for offset in range(0, len(letters), BATCH_MESSAGE_LENGTH)]
+    return lambda: model.score_batch(texts)
+
+
+def _bench_keys(count: int) -> list[KeySpec]:
+    return [
+        KeySpec(("IV", "II", "V"), "B", ("B", "R", "E"), ("Q", ALPHABET[index // 26 % 26], ALPHABET[index % 26]),
+                BENCH_PLUGBOARD)
+        for index in range(count)
+    ]
+
+
+@benchmark("evaluate_keys", sized=False)
+def bench_evaluate_keys(size: Optional[int]) -> Callable[[], object]:
+    # Scoring 100 keys against 1,000 letters of ciphertext, deciphering each whole message
+    model = _bench_ngram_model()
+    ciphertext = sample_message(1_000)
+    keys = _bench_keys(100)
+    return lambda: evaluate_keys(ciphertext, keys, model)
+
+
+@benchmark("evaluate_keys_pruned", sized=False)
+def bench_evaluate_keys_pruned(size: Optional[int]) -> Callable[[], object]:
+    # The same keys with a threshold every key fails at the first checkpoint, as hopeless keys do
+    model = _bench_ngram_model()
+    ciphertext = sample_message(1_000)
+    keys = _bench_keys(100)
+    return lambda: evaluate_keys(ciphertext, keys, model, threshold=0.0)
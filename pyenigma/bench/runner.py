@@ -0,0 +1,139 @@
+import argparse
+import datetime
+import json
+import logging
+import math
+import platform
+import sys
+import time
+from typing import Any, Callable, Optional, Sequence
+from .. import __version__, vectorized
+from .cases import BENCHMARKS
+
+
+logger = logging.getLogger(__name__)
+
+# Message sizes run by default, and with --full
+DEFAULT_SIZES = (10, 1_000, 100_000, 1_000_000)
+FULL_SIZES = (10, 1_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# Each benchmark is repeated until it has run for at least this many seconds, or MAX_REPEATS times
+MIN_TIME = 0.2
+MAX_REPEATS = 1_000
+
+# Calls on messages longer than this are not warmed up first, as a single call takes seconds
+WARMUP_MAX_SIZE = 1_000_000
+
+
+def measure(call: Callable[[], object], min_time: float, max_repeats: int, warmup: bool = True) -> list[float]:
+    # Time repeated calls, returning the seconds taken by each
+    if warmup:
+        call()
+    times: list[float] = []
+    total = 0.0
+    while len(times) < max_repeats and (not times or total < min_time):
+        start = time.perf_counter()
+        call()
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+    return times
+
+
+def percentile(sorted_times: Sequence[float], fraction: float) -> float:
+    # Nearest rank percentile of sorted_times
+    rank = max(0, min(len(sorted_times) - 1, math.ceil(fraction * len(sorted_times)) - 1))
+    return sorted_times[rank]
+
+
+def summarize(name: str, size: Optional[int], times: list[float]) -> dict[str, Any]:
+    ordered = sorted(times)
+    median = percentile(ordered, 0.5)
+    return {
+        "name": name,
+        "size": size,
+        "repeats": len(times),
+        "chars_per_sec": size / median if size and median > 0 else None,
+        "calls_per_sec": 1 / median if median > 0 else None,
+        "latency": {
+            "min": ordered[0],
+            "p50": median,
+            "p90": percentile(ordered, 0.9),
+            "p99": percentile(ordered, 0.99),
+            "max": ordered[-1],
+            "mean": sum(ordered) / len(ordered),
+        },
+    }
+
+
+def run_benchmarks(
+    names: Optional[Sequence[str]] = None,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    min_time: float = MIN_TIME,
+    max_repeats: int = MAX_REPEATS,
+) -> dict[str, Any]:
+    # Run the named benchmarks (all of them by default) and return the results with details of the environment,
+    # ready to be written as JSON
+    results = []
+    skipped: list[dict[str, Any]] = []
+    for name in names or BENCHMARKS:
+        bench = BENCHMARKS[name]
+        if not bench.available:
+            skipped.append({"name": name, "size": None, "reason": "unavailable"})
+            continue
+        for size in (sizes if bench.sized else [None]):
+            if size is not None and bench.max_size is not None and size > bench.max_size:
+                skipped.append({"name": name, "size": size, "reason": "above max size"})
+                continue
+            logger.info(f"Running benchmark {name} with size {size}")
+            call = bench.factory(size)
+            try:
+                times = measure(call, min_time, max_repeats, warmup=size is None or size <= WARMUP_MAX_SIZE)
+            finally:
+                # Calls holding resources, such as a thread pool, release them with close
+                close = getattr(call, "close", None)
+                if close is not None:
+                    close()
+            results.append(summarize(name, size, times))
+
+    return {
+        "pyenigma_version": __version__,
+        "python_version": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "numpy": vectorized.HAS_NUMPY,
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "results": results,
+        "skipped": skipped,
+    }
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="pyenigma bench", description="Benchmark the pyenigma encipher paths")
+    parser.add_argument("--benchmark", action="append", choices=list(BENCHMARKS),
+                        help="Run only this benchmark. May be given more than once")
+    parser.add_argument("--sizes", nargs="+", type=int, help="Message sizes in letters",
+                        default=list(DEFAULT_SIZES))
+    parser.add_argument("--full", action="store_true", help=f"Run every message size up to {FULL_SIZES[-1]:,} letters")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME,
+                        help="Minimum seconds to repeat each benchmark for")
+    parser.add_argument("--max-repeats", type=int, default=MAX_REPEATS, help="Maximum repeats of each benchmark")
+    parser.add_argument("--output", help="Write the JSON results to this file instead of standard output")
+    parser.add_argument("--list", action="store_true", help="List the benchmarks and exit")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    if args.list:
+        for name, bench in BENCHMARKS.items():
+            print(name if bench.available else f"{name} (unavailable)")
+        return
+
+    report = run_benchmarks(args.benchmark, FULL_SIZES if args.full else args.sizes, args.min_time, args.max_repeats)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
@@ -0,0 +1,229 @@
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, Sequence, TypeVar
+from .rotor import Rotor
+from .reflector import Reflector
+from .constants import ALPHABET, ALPHABET_INDEX, ROTOR_WIRING
+from .compiled import scrambler_table
+from .stepping import STATE_COUNT, state_positions, stepping_table
+from .normalize import normalize_message
+from .exceptions import (
+    BombeCribConflictException,
+    BombeCribOutOfRangeException,
+    BombeInvalidWorkersException,
+    BombeNumpyRequiredException
+)
+from .vectorized import HAS_NUMPY, Array
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# The rotors tried by default, giving 5 x 4 x 3 = 60 rotor orders
+BOMBE_ROTOR_MODELS = ("I", "II", "III", "IV", "V")
+
+Task = TypeVar("Task")
+Result = TypeVar("Result")
+
+
+class MenuEdge(NamedTuple):
+    # A crib letter and the ciphertext letter under it (as indices, A=0) and the crib's index in the message
+    plain: int
+    cipher: int
+    position: int
+
+
+class Menu(NamedTuple):
+    # The letter pairs of a crib, and the letter on the most pairs, which the bombe tests plugboard hypotheses for
+    edges: tuple[MenuEdge, ...]
+    test_letter: int
+
+
+class BombeStop(NamedTuple):
+    # A rotor order and start position consistent with the crib. The steckers are the plugboard pairs the menu
+    # determines, as (letter, plugged letter) with a letter paired with itself meaning it is not plugged.
+    rotors: tuple[str, ...]
+    positions: tuple[str, ...]
+    steckers: tuple[tuple[str, str], ...]
+
+
+def build_menu(ciphertext: str, crib: str, offset: int) -> Menu:
+    # Pair each crib letter with the ciphertext letter at the same place, the crib starting at offset letters into
+    # the normalized ciphertext
+    ciphertext = normalize_message(ciphertext)
+    crib = normalize_message(crib)
+    if not crib or offset < 0 or offset + len(crib) > len(ciphertext):
+        raise BombeCribOutOfRangeException(
+            f"Crib of {len(crib)} letters at offset {offset} does not fit in {len(ciphertext)} letters of ciphertext")
+
+    edges = []
+    for index, (plain, cipher) in enumerate(zip(crib, ciphertext[offset:])):
+        if plain == cipher:
+            raise BombeCribConflictException(
+                f"Crib letter {plain} at offset {offset + index} is the same as the ciphertext letter")
+        edges.append(MenuEdge(ALPHABET_INDEX[plain], ALPHABET_INDEX[cipher], offset + index))
+
+    degrees = Counter(letter for edge in edges for letter in (edge.plain, edge.cipher))
+    return Menu(tuple(edges), degrees.most_common(1)[0][0])
+
+
+def crib_states(middle_notches: str, right_notches: str, menu: Menu) -> Array:
+    # For every start state (the rotor positions before the first key press), the state each menu edge is
+    # enciphered at, as an array indexed [edge, start state]
+    next_state = np.array(stepping_table(middle_notches, right_notches), dtype=np.intp)
+    states = np.arange(STATE_COUNT, dtype=np.intp)
+    edge_states = np.empty((len(menu.edges), STATE_COUNT), dtype=np.intp)
+    presses = 0
+    for index, edge in sorted(enumerate(menu.edges), key=lambda item: item[1].position):
+        while presses <= edge.position:
+            states = next_state[states]
+            presses += 1
+        edge_states[index] = states
+    return edge_states
+
+
+def propagate(live: Array, menu: Menu, edge_permutations: Sequence[Array], test_letter: int) -> Array:
+    # Spread plugboard hypotheses to a fixed point. live[n, letter, value] means "letter is plugged to value" for
+    # the n-th candidate position. A menu edge from a to b with scrambler permutation E makes (a, y) imply
+    # (b, E(y)) and the reverse, as E is its own inverse. The diagonal board makes (a, y) imply (y, a).
+    # Candidates whose test letter has all 26 values live can no longer stop, so they are dropped as soon as
+    # that happens, and returned with every test register value set.
+    live = live.copy()
+    active = np.arange(len(live))
+    result = np.ones_like(live)
+    while len(active):
+        before = np.count_nonzero(live.reshape(len(live), -1), axis=1)
+        for edge, edge_permutation in zip(menu.edges, edge_permutations):
+            live[:, edge.cipher] |= np.take_along_axis(live[:, edge.plain], edge_permutation, axis=1)
+            live[:, edge.plain] |= np.take_along_axis(live[:, edge.cipher], edge_permutation, axis=1)
+        live |= live.transpose(0, 2, 1)
+        after = np.count_nonzero(live.reshape(len(live), -1), axis=1)
+
+        settled = (after == before) | live[:, test_letter].all(axis=1)
+        result[active[settled]] = live[settled]
+        keep = ~settled
+        active = active[keep]
+        live = live[keep]
+        edge_permutations = [edge_permutation[keep] for edge_permutation in edge_permutations]
+    return result
+
+
+def _hypothesis(count: int, letter: int, value: Array) -> Array:
+    live = np.zeros((count, 26, 26), dtype=bool)
+    live[np.arange(count), letter, value] = True
+    return live
+
+
+def _steckers(live: Array) -> tuple[tuple[str, str], ...]:
+    # The pairs the closure of a consistent hypothesis pins down: letters with exactly one live value
+    return tuple(
+        (ALPHABET[letter], ALPHABET[int(np.argmax(live[letter]))])
+        for letter in range(26)
+        if live[letter].sum() == 1 and np.argmax(live[letter]) >= letter
+    )
+
+
+def sweep_rotor_order(
+    menu: Menu,
+    rotor_order: Sequence[str],
+    reflector_model: str = "B",
+    ring_settings: Sequence[str] = ("A", "A", "A"),
+) -> list[BombeStop]:
+    # Test every start position of one rotor order against the menu. The test letter is hypothesised to be
+    # plugged to itself. At the right position the hypotheses spread either to just that value (the hypothesis
+    # is right) or to all values but one (the one left is right), so both counts are stops.
+    if not HAS_NUMPY:
+        raise BombeNumpyRequiredException("The bombe needs NumPy. Install pyenigma[numpy].")
+    rotors = [Rotor.get_rotor(model, ring_setting) for model, ring_setting in zip(rotor_order, ring_settings)]
+    table = np.frombuffer(scrambler_table(rotors, Reflector.get_reflector(reflector_model)), dtype=np.uint8)
+    rows = table.reshape(STATE_COUNT, 26).astype(np.intp)
+    edge_states = crib_states(rotors[1].notch, rotors[2].notch, menu)
+    edge_permutations = [rows[states] for states in edge_states]
+
+    test_letter = menu.test_letter
+    live = propagate(_hypothesis(STATE_COUNT, test_letter, np.full(STATE_COUNT, test_letter)), menu,
+                     edge_permutations, test_letter)
+    counts = live[:, test_letter].sum(axis=1)
+
+    # Where every value but one is live, run again from the value left to find its steckers
+    stops = np.flatnonzero((counts == 1) | (counts == 25))
+    retry = stops[counts[stops] == 25]
+    if len(retry):
+        values = np.argmin(live[retry, test_letter], axis=1)
+        live[retry] = propagate(_hypothesis(len(retry), test_letter, values), menu,
+                                [edge_permutation[retry] for edge_permutation in edge_permutations], test_letter)
+
+    results = []
+    for state in stops:
+        closure = live[state]
+        if closure[test_letter].sum() != 1:
+            continue
+        positions = tuple(ALPHABET[position] for position in state_positions(int(state)))
+        results.append(BombeStop(tuple(rotor_order), positions, _steckers(closure)))
+    logger.debug(f"Bombe found {len(results)} stops for rotor order {' '.join(rotor_order)}")
+    return results
+
+
+def _sweep_rotor_order_task(args: tuple[Menu, tuple[str, ...], str, tuple[str, ...]]) -> list[BombeStop]:
+    return sweep_rotor_order(*args)
+
+
+def rotor_orders(rotor_models: Iterable[str] = BOMBE_ROTOR_MODELS) -> list[tuple[str, ...]]:
+    return list(permutations(rotor_models, 3))
+
+
+def validated_rotor_orders(orders: Optional[Sequence[Sequence[str]]] = None) -> list[tuple[str, ...]]:
+    # The rotor orders to search as tuples (all 60 orders of rotors I-V by default), checking every model before
+    # any work is sent to worker processes
+    order_tuples = [tuple(order) for order in (orders or rotor_orders())]
+    for order in order_tuples:
+        for model in order:
+            if model not in ROTOR_WIRING:
+                Rotor.get_rotor(model)  # Raises the invalid model exception
+    return order_tuples
+
+
+def map_rotor_orders(
+    function: Callable[[Task], Result],
+    tasks: Sequence[Task],
+    workers: Optional[int] = None,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: tuple[Any, ...] = (),
+) -> Iterator[Result]:
+    # Yield function applied to each rotor order task, in order, spreading the tasks over a pool of worker
+    # processes (one per CPU by default). initializer is called with initargs in each worker, or once in this
+    # process when there is only one worker or task and the tasks run here.
+    workers = workers or os.cpu_count() or 1
+    logger.debug(f"Running {len(tasks)} rotor orders across {workers} processes")
+    if workers <= 1 or len(tasks) <= 1:
+        if initializer is not None:
+            initializer(*initargs)
+        yield from map(function, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as pool:
+        yield from pool.map(function, tasks)
+
+
+def run_bombe(
+    ciphertext: str,
+    crib: str,
+    offset: int,
+    reflector_model: str = "B",
+    orders: Optional[Sequence[Sequence[str]]] = None,
+    ring_settings: Sequence[str] = ("A", "A", "A"),
+    workers: Optional[int] = None,
+) -> list[BombeStop]:
+    # Test every start position of every rotor order (all 60 orders of rotors I-V by default) against a crib,
+    # returning the stops. Rotor orders are spread over a pool of worker processes. Like the real bombe, ring
+    # settings are assumed, so a middle rotor turnover inside the crib that the assumed rings put elsewhere can
+    # hide the right position.
+    if workers is not None and workers < 1:
+        raise BombeInvalidWorkersException(f"Number of workers must be at least 1. Got {workers}.")
+    menu = build_menu(ciphertext, crib, offset)
+    tasks = [(menu, order, reflector_model, tuple(ring_settings)) for order in validated_rotor_orders(orders)]
+    return [stop for stops in map_rotor_orders(_sweep_rotor_order_task, tasks, workers) for stop in stops]
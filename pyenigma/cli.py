@@ -1,4 +1,5 @@
 import argparse
+import sys
 from .machine import EnigmaMachine
 from .rotor import Rotor
 from .reflector import Reflector
@@ -6,6 +7,13 @@ from .plugboard import Plugboard
 from .constants import ALPHABET
 
 
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}")
+    return number
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description="Encrypt or decrypt a message using the Enigma machine")
     parser.add_argument("--rotors", nargs=3, help="The rotors to use", required=True, choices=["I", "II", "III", "IV", "V"])
@@ -15,11 +23,22 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--initial-rotor-positions", nargs=3, help="The initial rotor positions",
                         required=False, default=["A", "A", "A"], choices=[l for l in ALPHABET])
     parser.add_argument("--plugboard", help="The plugboard settings", required=False, default="")
-    parser.add_argument("--message", help="The message to encrypt or decrypt")
+    parser.add_argument("--message", help="The message to encrypt or decrypt. If omitted, the message is read from standard input")
+    parser.add_argument("--workers", type=positive_int, help="Encipher long messages in parallel using this many processes",
+                        required=False, default=1)
     return parser.parse_args()
 
 
 def main() -> None:
+    if sys.argv[1:2] == ["bench"]:
+        from .bench import main as bench_main
+        bench_main(sys.argv[2:])
+        return
+    if sys.argv[1:2] == ["ngrams"]:
+        from .ngrams import main as ngrams_main
+        ngrams_main(sys.argv[2:])
+        return
+
     args = parse_args()
 
     first_rotor = Rotor.get_rotor(
@@ -48,7 +67,13 @@ def main() -> None:
     enigma.set_reflector(reflector)
     enigma.set_plugboard(plugboard_settings)
 
-    print(enigma.encipher(args.message))
+    if args.message is None:
+        enigma.encipher_stream(sys.stdin, sys.stdout)
+        print()
+    elif args.workers > 1:
+        print(enigma.encipher_parallel(args.message, workers=args.workers))
+    else:
+        print(enigma.encipher(args.message))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+import logging
+import threading
+from collections import OrderedDict
+from operator import itemgetter
+from typing import Callable, Hashable, Optional
+from .rotor import Rotor
+from .reflector import Reflector
+from .plugboard import Plugboard
+from .constants import ALPHABET, ALPHABET_INDEX
+from .stepping import state_positions
+
+
+logger = logging.getLogger(__name__)
+
+# Translation tables between the letters A-Z and their indices 0-25, for use with bytes.translate
+LETTER_TO_INDEX = bytes(ALPHABET_INDEX.get(chr(code), code) for code in range(256))
+INDEX_TO_LETTER = bytes(ord(ALPHABET[code]) if code < 26 else code for code in range(256))
+
+# Number of compiled machine tables (about 457 KB each) kept by the process wide cache
+COMPILED_TABLE_CACHE_SIZE = 32
+
+
+def _translate_table(mapping: list[int]) -> bytes:
+    # Build a 256 byte bytes.translate table from a 26 entry index mapping
+    return bytes(mapping) + bytes(range(26, 256))
+
+
+def reflector_indices(reflector: Reflector) -> list[int]:
+    return [ALPHABET_INDEX[letter] for letter in reflector._wiring]
+
+
+def plugboard_indices(plugboard: Plugboard) -> list[int]:
+    return list(plugboard.wiring())
+
+
+class Scrambler():
+    # Builds the permutation of the machine for rotor states, with an optional plugboard wiring (the identity
+    # by default). The path of a letter is split so that the left rotor and reflector are combined once per left
+    # position, the middle rotor once per (left, middle) pair, and only the right rotor and plugboard are applied
+    # per state using C level itemgetter/translate calls. Permutations of single states are built on demand and
+    # kept, so callers touching a few thousand states do not pay for the whole table.
+    def __init__(self, rotors: list[Rotor], reflector: Reflector, plugboard_wiring: Optional[list[int]] = None) -> None:
+        left_rotor, self._middle_rotor, right_rotor = rotors
+        reflector_wiring = reflector_indices(reflector)
+        plugboard_wiring = plugboard_wiring or list(range(26))
+
+        self._inner = []
+        for left in range(26):
+            left_forward = left_rotor._forward_tables[left]
+            left_backward = left_rotor._backward_tables[left]
+            self._inner.append([left_backward[reflector_wiring[left_forward[index]]] for index in range(26)])
+
+        self._entry_getters = []
+        self._exit_tables = []
+        for right in range(26):
+            right_forward = right_rotor._forward_tables[right]
+            right_backward = right_rotor._backward_tables[right]
+            self._entry_getters.append(itemgetter(*[right_forward[plugboard_wiring[index]] for index in range(26)]))
+            self._exit_tables.append(_translate_table([plugboard_wiring[right_backward[index]] for index in range(26)]))
+
+        self._cores: dict[int, bytes] = {}
+        self._rows: dict[int, bytes] = {}
+
+    def _core(self, left: int, middle: int) -> bytes:
+        # The permutation of the middle rotor, left rotor and reflector, before the right rotor and plugboard
+        key = left * 26 + middle
+        core = self._cores.get(key)
+        if core is None:
+            middle_forward = self._middle_rotor._forward_tables[middle]
+            middle_backward = self._middle_rotor._backward_tables[middle]
+            inner = self._inner[left]
+            core = self._cores[key] = bytes(middle_backward[inner[middle_forward[index]]] for index in range(26))
+        return core
+
+    def row(self, state: int) -> bytes:
+        # The 26 output indices for a single state
+        row = self._rows.get(state)
+        if row is None:
+            left, middle, right = state_positions(state)
+            row = self._rows[state] = bytes(self._entry_getters[right](self._core(left, middle))).translate(
+                self._exit_tables[right])
+        return row
+
+    def table(self) -> bytes:
+        # The 26 output indices of every state (see stepping.state_id) back to back
+        table = bytearray()
+        for left in range(26):
+            for middle in range(26):
+                core = self._core(left, middle)
+                for right in range(26):
+                    table += bytes(self._entry_getters[right](core)).translate(self._exit_tables[right])
+        return bytes(table)
+
+
+class CompiledTableCache():
+    # A size bounded LRU cache of compiled machine tables, shared by every machine in the process so that a
+    # configuration seen before (such as a daily key) is compiled once. Safe to use from several threads; two
+    # threads missing on the same key at once may both build the table.
+    def __init__(self, maxsize: int = COMPILED_TABLE_CACHE_SIZE) -> None:
+        self.maxsize = maxsize
+        self._tables: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, build: Callable[[], bytes]) -> bytes:
+        # Return the table cached under key, building and caching it with build if it is not cached
+        return self.lookup(key, build)[0]
+
+    def lookup(self, key: Hashable, build: Callable[[], bytes]) -> tuple[bytes, bool]:
+        # The same as get, also returning whether the table was found in the cache
+        with self._lock:
+            table = self._tables.get(key)
+            if table is not None:
+                self._tables.move_to_end(key)
+                self.hits += 1
+                return table, True
+            self.misses += 1
+
+        table = build()
+        with self._lock:
+            self._tables[key] = table
+            self._evict()
+        return table, False
+
+    def _evict(self) -> None:
+        while len(self._tables) > self.maxsize:
+            self._tables.popitem(last=False)
+            self.evictions += 1
+
+    def resize(self, maxsize: int) -> None:
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self) -> None:
+        # Drop every table and zero the counters
+        with self._lock:
+            self._tables.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._tables),
+                "maxsize": self.maxsize,
+            }
+
+    def __len__(self) -> int:
+        return len(self._tables)
+
+
+# The cache used by scrambler_table
+COMPILED_TABLE_CACHE = CompiledTableCache()
+
+
+def scrambler_config_key(rotors: list[Rotor], reflector: Reflector) -> tuple[Hashable, ...]:
+    # A canonical key for everything the scrambler table depends on. Rotors and reflectors are identified by their
+    # wiring rather than model name so custom parts are keyed correctly. Notches and positions only affect
+    # stepping, and the plugboard is applied on top of the table, so machines differing in them share a table.
+    return (
+        tuple(rotor._wiring for rotor in rotors),
+        tuple(rotor._ring_setting for rotor in rotors),
+        reflector._wiring,
+    )
+
+
+def scrambler_table(rotors: list[Rotor], reflector: Reflector) -> bytes:
+    # The permutation of the rotors and reflector, without a plugboard, for every rotor state, built once per
+    # configuration and then reused from the cache
+    return scrambler_table_lookup(rotors, reflector)[0]
+
+
+def scrambler_table_lookup(rotors: list[Rotor], reflector: Reflector) -> tuple[bytes, bool]:
+    # The same as scrambler_table, also returning whether the table came from the cache
+    def build() -> bytes:
+        table = Scrambler(rotors, reflector).table()
+        logger.debug(f"Compiled scrambler table of {len(table)} bytes")
+        return table
+    return COMPILED_TABLE_CACHE.lookup(scrambler_config_key(rotors, reflector), build)
+
+
+def plugboard_tables(plugboard: Plugboard) -> tuple[bytes, bytes]:
+    # Return bytes.translate tables taking letters to plugged indices, and indices to plugged letters. The
+    # machine permutation is the scrambler permutation conjugated by the plugboard, and the plugboard is its own
+    # inverse, so enciphering with a scrambler table is translate in, look up, translate out. Swapping the
+    # plugboard only means building these two 256 byte tables again.
+    swaps = _translate_table(plugboard_indices(plugboard))
+    return LETTER_TO_INDEX.translate(swaps), swaps.translate(INDEX_TO_LETTER)
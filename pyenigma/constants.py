@@ -1,4 +1,5 @@
 ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ALPHABET_INDEX = {letter: index for index, letter in enumerate(ALPHABET)}
 
 ROTOR_WIRING = {
     "I": "EKMFLGDQVZNTOWYHXUSPAIBRCJ",
@@ -0,0 +1,132 @@
+import logging
+from typing import Callable, Iterable, Optional, Sequence
+from .rotor import Rotor
+from .reflector import Reflector
+from .plugboard import Plugboard
+from .compiled import LETTER_TO_INDEX, Scrambler, plugboard_tables
+from .stepping import state_id, stepping_table
+from .normalize import normalize_message
+from .batch import KeySpec
+from .ngrams import NgramModel
+from .attack import Candidate, keep_top, validate_top_k
+from .stats import PruneStats
+
+
+logger = logging.getLogger(__name__)
+
+# Letters deciphered before each check of a candidate's running score. The whole message is always scored last.
+PRUNE_CHECKPOINTS = (25, 50, 100, 200, 400, 800)
+
+# Against the top-K bound, a candidate is dropped at a checkpoint when its running score is more than this below
+# the worst score kept. A short prefix scores less steadily than the whole message, so without a margin a right
+# key with an unusual start could be dropped.
+PRUNE_MARGIN = 0.5
+
+
+class PrunedEvaluator():
+    # Deciphers one message under many keys and scores each decryption by the mean log10 probability of its
+    # n-grams, a checkpoint at a time so that hopeless keys are dropped after a few letters. Keys sharing rotors,
+    # ring settings and reflector share a Scrambler, which builds the permutation of each state the first time it
+    # is reached, so a key dropped after 25 letters costs 25 rows rather than a compiled table.
+    def __init__(self, ciphertext: str, model: NgramModel, checkpoints: Sequence[int] = PRUNE_CHECKPOINTS,
+                 stats: Optional[PruneStats] = None) -> None:
+        self.letters = normalize_message(ciphertext).encode("ascii")
+        self.model = model
+        self.stats = stats
+        self.ends = sorted({checkpoint for checkpoint in checkpoints if 0 < checkpoint < len(self.letters)}
+                           | {len(self.letters)})
+        self._scramblers: dict[tuple[tuple[str, ...], tuple[str, ...], str],
+                               tuple[Callable[[int], bytes], tuple[int, ...]]] = {}
+        self._plugboards: dict[str, tuple[bytes, bytes]] = {}
+
+    def _scrambler(self, key: KeySpec) -> tuple[Callable[[int], bytes], tuple[int, ...]]:
+        scrambler_key = (tuple(key.rotors), tuple(key.ring_settings), key.reflector)
+        scrambler = self._scramblers.get(scrambler_key)
+        if scrambler is None:
+            rotors = [Rotor.get_rotor(model, ring_setting) for model, ring_setting in zip(key.rotors, key.ring_settings)]
+            scrambler = self._scramblers[scrambler_key] = (
+                Scrambler(rotors, Reflector.get_reflector(key.reflector)).row,
+                stepping_table(rotors[1].notch, rotors[2].notch),
+            )
+        return scrambler
+
+    def _plugboard(self, connection_string: str) -> tuple[bytes, bytes]:
+        # Tables taking ASCII letters to indices into the scrambler, and scrambler indices to plaintext indices
+        tables = self._plugboards.get(connection_string)
+        if tables is None:
+            plugboard = Plugboard()
+            plugboard.add_connection_from_string(connection_string)
+            plug_in, plug_out = plugboard_tables(plugboard)
+            tables = self._plugboards[connection_string] = (plug_in, plug_out.translate(LETTER_TO_INDEX))
+        return tables
+
+    def score(self, key: KeySpec, bound: Optional[float] = None, threshold: Optional[float] = None) -> Optional[float]:
+        # Return the score of the whole decryption under key, or None if the key was dropped: because its running
+        # score was below bound at a checkpoint before the last, or its whole message score was below threshold
+        row, next_state = self._scrambler(key)
+        plug_in, plug_out = self._plugboard(key.plugboard)
+        state = state_id(*(Rotor._letter_to_index(position) for position in key.positions))
+        letters = self.letters
+        n = self.model.n
+        tail = b""
+        total = 0.0
+        start = 0
+        score = 0.0
+        for end in self.ends:
+            decrypted = bytearray(letters[start:end].translate(plug_in))
+            for i, index in enumerate(decrypted):
+                state = next_state[state]
+                decrypted[i] = row(state)[index]
+            indices = tail + decrypted.translate(plug_out)
+            total += self.model.score_indices(indices)
+            tail = indices[-(n - 1):] if n > 1 else b""
+            start = end
+            grams = end - n + 1
+            score = total / grams if grams > 0 else 0.0
+
+            limit = threshold if end == len(letters) else bound
+            if limit is not None and score < limit:
+                if self.stats is not None:
+                    self.stats.record_checkpoint(end, score, pruned=True)
+                    self.stats.record_candidate(end, len(letters), completed=False)
+                return None
+            if self.stats is not None:
+                self.stats.record_checkpoint(end, score, pruned=False)
+
+        if self.stats is not None:
+            self.stats.record_candidate(len(letters), len(letters), completed=True)
+        return score
+
+
+def evaluate_keys(
+    ciphertext: str,
+    keys: Iterable[KeySpec],
+    model: NgramModel,
+    threshold: Optional[float] = None,
+    top_k: Optional[int] = None,
+    checkpoints: Sequence[int] = PRUNE_CHECKPOINTS,
+    margin: float = PRUNE_MARGIN,
+    stats: Optional[PruneStats] = None,
+) -> list[Candidate]:
+    # Score the decryption of a message under each key, returning the keys best first. A key is dropped as soon
+    # as its running score at a checkpoint is below threshold, or once top_k keys have been kept and it is more
+    # than margin below the worst of them. Keys below threshold over the whole message are left out. Pass a
+    # PruneStats to collect the running scores at each checkpoint, to choose a threshold from.
+    if top_k is not None:
+        validate_top_k(top_k)
+    evaluator = PrunedEvaluator(ciphertext, model, checkpoints, stats)
+    heap: list[Candidate] = []
+    results: list[Candidate] = []
+    for key in keys:
+        bound = threshold
+        if top_k is not None and len(heap) >= top_k:
+            bound = heap[0].score - margin if bound is None else max(bound, heap[0].score - margin)
+        score = evaluator.score(key, bound, threshold)
+        if score is None:
+            continue
+        if top_k is None:
+            results.append(Candidate(score, key))
+        else:
+            keep_top(heap, Candidate(score, key), top_k)
+    logger.debug(f"Evaluated keys against {len(evaluator.letters)} letters at checkpoints {evaluator.ends}")
+    return sorted(heap if top_k is not None else results, reverse=True)
@@ -33,6 +33,16 @@ class PlugboardStringOddNumberOfLettersException(PlugboardException):
     pass
 
 
+class PlugboardLetterNotConnectedException(PlugboardException):
+    """Occurs when disconnecting a letter that has no connection"""
+    pass
+
+
+class PlugboardNothingToUndoException(PlugboardException):
+    """Occurs when undoing a change with no changes left to undo"""
+    pass
+
+
 class ReflectorException(EnigmaException):
     """Base class for exceptions related to the Reflector"""
     pass
@@ -81,3 +91,103 @@ class RotorInvalidLetterException(RotorException):
 class RotorInvalidModelException(RotorException):
     """Occurs when an invalid rotor model is provided"""
     pass
+
+
+class EnigmaMachineException(EnigmaException):
+    """Base class for exceptions related to the Enigma Machine"""
+    pass
+
+
+class EnigmaMachineInvalidOffsetException(EnigmaMachineException):
+    """Occurs when a negative message offset is requested"""
+    pass
+
+
+class EnigmaMachineBatchSizeMismatchException(EnigmaMachineException):
+    """Occurs when a batch has a different number of keys and messages"""
+    pass
+
+
+class EnigmaMachineBufferTooSmallException(EnigmaMachineException):
+    """Occurs when an output buffer is too small to hold the ciphertext"""
+    pass
+
+
+class EnigmaMachineInvalidStateException(EnigmaMachineException):
+    """Occurs when a machine state does not have the expected number of values"""
+    pass
+
+
+class EnigmaMachineInvalidWorkersException(EnigmaMachineException):
+    """Occurs when parallel enciphering is asked to use fewer than 1 worker process"""
+    pass
+
+
+class EnigmaMachineInvalidChunkSizeException(EnigmaMachineException):
+    """Occurs when a message is split into chunks of fewer than 1 letter"""
+    pass
+
+
+class EnigmaMachineSameFileException(EnigmaMachineException):
+    """Occurs when a file is enciphered into itself"""
+    pass
+
+
+class BombeException(EnigmaException):
+    """Base class for exceptions related to the Bombe"""
+    pass
+
+
+class BombeCribOutOfRangeException(BombeException):
+    """Occurs when a crib is empty or does not fit in the ciphertext at its offset"""
+    pass
+
+
+class BombeCribConflictException(BombeException):
+    """Occurs when a crib letter is the same as the ciphertext letter it lies under, which Enigma cannot produce"""
+    pass
+
+
+class BombeInvalidWorkersException(BombeException):
+    """Occurs when the Bombe is asked to use fewer than 1 worker process"""
+    pass
+
+
+class BombeNumpyRequiredException(BombeException):
+    """Occurs when the Bombe is run without NumPy installed"""
+    pass
+
+
+class AttackException(EnigmaException):
+    """Base class for exceptions related to key recovery attacks"""
+    pass
+
+
+class AttackInvalidTopKException(AttackException):
+    """Occurs when an attack is asked to keep fewer than 1 candidate"""
+    pass
+
+
+class AttackInvalidWorkersException(AttackException):
+    """Occurs when an attack is asked to use fewer than 1 worker process"""
+    pass
+
+
+class AttackInvalidMaxPairsException(AttackException):
+    """Occurs when a plugboard search is asked for fewer than 0 or more than 10 pairs"""
+    pass
+
+
+class NgramException(EnigmaException):
+    """Base class for exceptions related to n-gram models"""
+    pass
+
+
+class NgramInvalidOrderException(NgramException):
+    """Occurs when an n-gram model is asked for n-grams shorter than 1 letter or longer than the longest supported"""
+    pass
+
+
+class NgramInvalidFileException(NgramException):
+    """Occurs when a file is not an n-gram table, or is truncated"""
+    pass
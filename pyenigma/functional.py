@@ -0,0 +1,81 @@
+from typing import NamedTuple, Sequence
+from .rotor import Rotor
+from .reflector import Reflector
+from .plugboard import Plugboard
+from .constants import ALPHABET
+from .compiled import plugboard_tables, scrambler_table
+from .stepping import state_id, state_positions, stepping_table
+from .normalize import normalize_message
+from .batch import KeySpec
+from . import vectorized
+
+
+class CompiledConfig(NamedTuple):
+    # Everything needed to encipher under one key except the rotor positions, with every field immutable. One
+    # config can be shared by any number of threads, each passing its own state to encipher.
+    middle_notches: str
+    right_notches: str
+    next_state: tuple[int, ...]
+    table: bytes
+    plugboard_wiring: bytes
+    plug_in: bytes
+    plug_out: bytes
+
+
+def compile_components(rotors: list[Rotor], reflector: Reflector, plugboard: Plugboard) -> CompiledConfig:
+    # Build a config from machine components. The scrambler table comes from the compiled table cache.
+    plug_in, plug_out = plugboard_tables(plugboard)
+    return CompiledConfig(
+        middle_notches=rotors[1].notch,
+        right_notches=rotors[2].notch,
+        next_state=stepping_table(rotors[1].notch, rotors[2].notch),
+        table=scrambler_table(rotors, reflector),
+        plugboard_wiring=plugboard.wiring(),
+        plug_in=plug_in,
+        plug_out=plug_out,
+    )
+
+
+def compile_config(key: KeySpec) -> tuple[CompiledConfig, int]:
+    # Build a config from a key, validating every setting, and return it with the state of the key's positions
+    rotors = [Rotor.get_rotor(model, ring_setting) for model, ring_setting in zip(key.rotors, key.ring_settings)]
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(key.plugboard)
+    return compile_components(rotors, Reflector.get_reflector(key.reflector), plugboard), positions_to_state(key.positions)
+
+
+def positions_to_state(positions: Sequence[str]) -> int:
+    # The state of the rotor positions, given as letters from left to right
+    return state_id(*(Rotor._letter_to_index(position) for position in positions))
+
+
+def state_to_positions(state: int) -> tuple[str, ...]:
+    return tuple(ALPHABET[position] for position in state_positions(state))
+
+
+def encipher_letters(config: CompiledConfig, letters: bytes, start_state: int) -> tuple[bytes, int]:
+    # Encipher normalized letters as ASCII bytes from start_state, returning the ciphertext and the final state.
+    # Long messages use NumPy when it is installed.
+    if vectorized.HAS_NUMPY and len(letters) >= vectorized.VECTORIZED_MIN_LENGTH:
+        return vectorized.encipher_table_letters(config.middle_notches, config.right_notches, config.table,
+                                                 config.plugboard_wiring, start_state, letters)
+
+    next_state = config.next_state
+    table = config.table
+    state = start_state
+    encrypted = bytearray(letters.translate(config.plug_in))
+    for i, index in enumerate(encrypted):
+        state = next_state[state]
+        encrypted[i] = table[state * 26 + index]
+    return bytes(encrypted.translate(config.plug_out)), state
+
+
+def encipher(config: CompiledConfig, message: str, start_state: int) -> tuple[str, int]:
+    # Encipher a message from start_state, returning the ciphertext and the state to pass for the text that
+    # follows. Nothing shared is modified, so threads can encipher with one config at the same time.
+    encrypted, state = encipher_letters(config, normalize_message(message).encode("ascii"), start_state)
+    return encrypted.decode("ascii"), state
+
+
+def decipher(config: CompiledConfig, message: str, start_state: int) -> tuple[str, int]:
+    return encipher(config, message, start_state)  # Deciphering is the same as enciphering in the Enigma Machine
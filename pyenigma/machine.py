@@ -1,33 +1,118 @@
+import array
 import logging
+import mmap
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Any, Iterable, Iterator, Optional, Union
 from .rotor import Rotor
 from .reflector import Reflector
-from .plugboard import Plugboard
+from .plugboard import MAX_CONNECTIONS, Plugboard
 from .constants import ALPHABET
+from .compiled import plugboard_tables, scrambler_table_lookup
+from .stepping import rotor_stepping_schedule, rotor_stepping_table, state_id, state_positions
+from .normalize import count_letters, normalize_bytes, normalize_message, log_removed
+from .stats import BatchCallback, MachineStats
+from .exceptions import (
+    EnigmaMachineBufferTooSmallException,
+    EnigmaMachineInvalidChunkSizeException,
+    EnigmaMachineInvalidOffsetException,
+    EnigmaMachineInvalidStateException,
+    EnigmaMachineInvalidWorkersException,
+    EnigmaMachineSameFileException
+)
+from .functional import CompiledConfig, compile_components
+from . import vectorized
 
 
 logger = logging.getLogger(__name__)
 
+# Messages shorter than this are not worth the cost of starting worker processes for
+PARALLEL_MIN_CHUNK_SIZE = 100_000
+
+# Number of characters read at a time by encipher_stream
+STREAM_CHUNK_SIZE = 65_536
+
+# Number of bytes enciphered at a time by encipher_file
+FILE_CHUNK_SIZE = 1 << 22
+
+# Number of source bytes normalized and enciphered at a time by encipher_into
+INTO_BLOCK_SIZE = 1 << 16
+
+# Number of values in a state returned by get_state: three rotor positions and the 26 letter plugboard wiring
+STATE_LENGTH = 3 + len(ALPHABET)
+
+# Objects supporting the buffer protocol accepted by encipher_into
+BufferLike = Union[bytes, bytearray, memoryview, mmap.mmap, "array.array[int]"]
+
 
 class EnigmaMachine():
+    __slots__ = ("rotors", "reflector", "plugboard", "_compiled_table", "_compiled_wiring", "_plug_in", "_plug_out",
+                 "_trace", "_stats")
+
     def __init__(self) -> None:
+        self._compiled_table: Optional[bytes] = None
+        self._compiled_wiring = b""
+        self._plug_in = b""
+        self._plug_out = b""
+        self._trace = False
+        self._stats: Optional[MachineStats] = None
         logger.debug("Initialized Enigma Machine")
 
     def set_rotors(self, rotors: list[Rotor]) -> None:
         logger.debug("Setting rotors")
         self.rotors = rotors
+        self._compiled_table = None
 
     def set_reflector(self, reflector: Reflector) -> None:
         logger.debug("Setting reflector")
         self.reflector = reflector
+        self._compiled_table = None
 
     def set_plugboard(self, plugboard: Plugboard) -> None:
         logger.debug("Setting plugboard")
         self.plugboard = plugboard
+        if self._compiled_table is not None:
+            self._relabel()
 
-    def _encipher_letter(self, letter: str) -> str:
-        original_letter = letter
-        logger.debug(f"Starting encryption of letter {original_letter}")
+    def compile(self) -> None:
+        # Precompute the rotor and reflector permutation for all 26^3 rotor states so that encipher costs one
+        # table lookup per letter. The plugboard is applied on top of the table by two translate calls, so changing
+        # it does not need a recompile. Worth it when the same rotors are used for many or long messages.
+        start = time.perf_counter()
+        self._compiled_table, cached = scrambler_table_lookup(self.rotors, self.reflector)
+        self._relabel()
+        if self._stats is not None:
+            self._stats.record_compile(time.perf_counter() - start, cached)
+        logger.debug("Compiled Enigma Machine")
 
+    @property
+    def is_compiled(self) -> bool:
+        return self._compiled_table is not None
+
+    def set_trace(self, enabled: bool) -> None:
+        # Per-letter diagnostics are only logged in trace mode, which always uses the per-letter path. Outside of
+        # trace mode, enciphering does no logging work per letter.
+        logger.debug(f"Setting trace mode to {enabled}")
+        self._trace = enabled
+
+    def set_stats(self, enabled: bool, callback: Optional[BatchCallback] = None) -> None:
+        # Count letters, rotor steps, compiles and their compiled table cache hits, plugboard table reuses and
+        # relabels, and time spent normalizing and enciphering. The callback, if given, is called with a dict
+        # describing each batch enciphered. Enabling stats again starts the counters from zero. While disabled, the only cost is one check per batch.
+        logger.debug(f"Setting stats to {enabled}")
+        self._stats = MachineStats(callback) if enabled else None
+
+    def stats(self) -> Optional[dict[str, Any]]:
+        # A snapshot of the counters, or None when stats are disabled
+        return self._stats.snapshot() if self._stats is not None else None
+
+    def reset_stats(self) -> None:
+        if self._stats is not None:
+            self._stats.reset()
+
+    def _encipher_letter(self, letter: str) -> str:
         # Pass the letter through the plugboard
         letter = self.plugboard.translate(letter)
 
@@ -43,10 +128,37 @@ class EnigmaMachine():
             letter = rotor.pass_backward(letter)
 
         # Pass the letter back through the plugboard
+        return self.plugboard.translate(letter)
+
+    def _trace_letter(self, letter: str) -> str:
+        # The same as _encipher_letter, logging the letter after each component
+        original_letter = letter
+        positions = "".join(rotor.rotor_position for rotor in self.rotors)
+        logger.debug(f"Starting encryption of letter {original_letter}, rotor positions {positions}")
+
         letter = self.plugboard.translate(letter)
+        logger.debug(f"Plugboard translated letter {original_letter} to {letter}")
+
+        for rotor in reversed(self.rotors):
+            translated_letter = rotor.pass_forward(letter)
+            logger.debug(f"Rotor {rotor._rotor_model} at position {rotor.rotor_position}, ring setting {
+                rotor._ring_setting} translated letter {letter} forward to {translated_letter}")
+            letter = translated_letter
 
-        logger.debug(f"Encrypted letter {original_letter} to {letter}")
-        return letter
+        reflected_letter = self.reflector.reflect(letter)
+        logger.debug(f"Reflector reflected letter {letter} to {reflected_letter}")
+        letter = reflected_letter
+
+        for rotor in self.rotors:
+            translated_letter = rotor.pass_backward(letter)
+            logger.debug(f"Rotor {rotor._rotor_model} at position {rotor.rotor_position}, ring setting {
+                rotor._ring_setting} translated letter {letter} backward to {translated_letter}")
+            letter = translated_letter
+
+        plugged_letter = self.plugboard.translate(letter)
+        logger.debug(f"Plugboard translated letter {letter} to {plugged_letter}")
+        logger.debug(f"Encrypted letter {original_letter} to {plugged_letter}")
+        return plugged_letter
 
     @staticmethod
     def _next_letter(letter: str) -> str:
@@ -56,38 +168,325 @@ class EnigmaMachine():
         else:
             return chr(ord(letter) + 1)  # Gets the next letter
 
-    def _normalize_message(self, message: str) -> str:
-        message = message.upper().replace(" ", "")
-        for letter in message:
-            if letter not in ALPHABET:
-                logger.warning(f"Removing invalid character {letter} from message")
-                message = message.replace(letter, "")
-        return message
+    @staticmethod
+    def _normalize_message(message: str, removed: Optional[Counter[str]] = None) -> str:
+        return normalize_message(message, removed)
+
+    def _normalize(self, message: str, removed: Optional[Counter[str]] = None) -> str:
+        # Normalize a message, timing it when stats are enabled
+        if self._stats is None:
+            return self._normalize_message(message, removed)
+        start = time.perf_counter()
+        normalized = self._normalize_message(message, removed)
+        self._stats.normalize_time += time.perf_counter() - start
+        return normalized
+
+    def _normalize_bytes(self, data: bytes, removed: Optional[Counter[str]] = None) -> bytes:
+        if self._stats is None:
+            return normalize_bytes(data, removed)
+        start = time.perf_counter()
+        normalized = normalize_bytes(data, removed)
+        self._stats.normalize_time += time.perf_counter() - start
+        return normalized
+
+    def _state_id(self) -> int:
+        return state_id(*(rotor._position for rotor in self.rotors))
+
+    def _set_state_id(self, state: int) -> None:
+        for rotor, position in zip(self.rotors, state_positions(state)):
+            rotor._position = position
+
+    def _encipher_compiled(self, letters: bytes) -> bytes:
+        self._refresh_compiled()
+        table = self._compiled_table
+        assert table is not None
+
+        next_state = rotor_stepping_table(self.rotors)
+        state = self._state_id()
+
+        encrypted = bytearray(letters.translate(self._plug_in))
+        for i, index in enumerate(encrypted):
+            state = next_state[state]
+            encrypted[i] = table[state * 26 + index]
+
+        self._set_state_id(state)
+        return bytes(encrypted.translate(self._plug_out))
+
+    def _relabel(self) -> None:
+        # Build the plugboard translate tables applied around the compiled table
+        self._plug_in, self._plug_out = plugboard_tables(self.plugboard)
+        self._compiled_wiring = self.plugboard.wiring()
+
+    def _refresh_compiled(self) -> None:
+        # The plugboard tables go stale if the connections change after compiling, so rebuild them
+        stale = self.plugboard._wiring != self._compiled_wiring
+        if stale:
+            self._relabel()
+        if self._stats is not None:
+            self._stats.record_plugboard_check(stale)
+
+    def _encipher_vectorized(self, letters: bytes) -> bytes:
+        if self._compiled_table is not None:
+            self._refresh_compiled()
+        encrypted, state = vectorized.encipher_letters(
+            self.rotors, self.reflector, self.plugboard, self._state_id(), letters, self._compiled_table)
+        self._set_state_id(state)
+        return encrypted
+
+    def _step_rotors(self) -> None:
+        # Step the rotors for one key press with the precomputed stepping table, which handles the double stepping
+        # of the Enigma Machine. See: https://www.ciphermachinesandcryptology.com/en/enigmatech.htm#steppingmechanism
+        self._set_state_id(rotor_stepping_table(self.rotors)[self._state_id()])
+
+    def _encipher_path(self, length: int) -> str:
+        # Trace mode always uses the per-letter path. Otherwise long messages use the NumPy backend when it is
+        # installed, then the compiled table if there is one, then the per-letter path.
+        if self._trace:
+            return "traced"
+        if vectorized.HAS_NUMPY and length >= vectorized.VECTORIZED_MIN_LENGTH:
+            return "vectorized"
+        if self._compiled_table is not None:
+            return "compiled"
+        return "per_letter"
+
+    def _encipher_letters(self, letters: bytes) -> bytes:
+        # Encipher normalized letters as ASCII bytes
+        path = self._encipher_path(len(letters))
+        if self._stats is not None:
+            return self._encipher_measured(path, letters)
+        return self._encipher_by_path(path, letters)
+
+    def _encipher_by_path(self, path: str, letters: bytes) -> bytes:
+        if path == "vectorized":
+            return self._encipher_vectorized(letters)
+        if path == "compiled":
+            return self._encipher_compiled(letters)
+        if path == "traced":
+            return "".join(self._trace_step_and_letter(letter) for letter in letters.decode("ascii")).encode("ascii")
+
+        next_state = rotor_stepping_table(self.rotors)
+        state = self._state_id()
+        left, middle, right = self.rotors
+        encrypted_message = []
+        for letter in letters.decode("ascii"):
+            # Step the rotors, then encrypt the letter and append it to the encrypted message
+            stepped = next_state[state]
+            right._position = stepped % 26
+            # The left and middle rotors only move when the middle one steps
+            if stepped // 26 != state // 26:
+                left._position, middle._position = stepped // 676, stepped // 26 % 26
+            state = stepped
+            encrypted_message.append(self._encipher_letter(letter))
+        return "".join(encrypted_message).encode("ascii")
+
+    def _encipher_measured(self, path: str, letters: bytes) -> bytes:
+        start_state = self._state_id()
+        start = time.perf_counter()
+        encrypted = self._encipher_by_path(path, letters)
+        self._record_batch(path, start_state, len(letters), time.perf_counter() - start)
+        return encrypted
+
+    def _record_batch(self, path: str, start_state: int, letters: int, seconds: float) -> None:
+        assert self._stats is not None
+        middle_steps, double_steps = rotor_stepping_schedule(self.rotors).step_counts(start_state, letters)
+        self._stats.record_batch(path, letters, middle_steps, double_steps, seconds)
+
+    def _trace_step_and_letter(self, letter: str) -> str:
+        self._step_rotors()
+        return self._trace_letter(letter)
+
+    def _encipher_normalized(self, message: str) -> str:
+        return self._encipher_letters(message.encode("ascii")).decode("ascii")
 
     def encipher(self, message: str) -> str:
-        message = self._normalize_message(message)
-        encrypted_message = ""
-
-        for letter in message:
-            # Rotate the rightmost rotor before encrypting the letter
-            self.rotors[2].rotate()
-
-            # Rotate the middle rotor if the rightmost rotor is at the notch
-            if self.rotors[2].notch == self.rotors[2].rotor_position:
-                self.rotors[1].rotate()
-            # Handle the double stepping of the Enigma Machine. See: https://www.ciphermachinesandcryptology.com/en/enigmatech.htm#steppingmechanism
-            elif self.rotors[1].notch == self._next_letter(self.rotors[1].rotor_position):
-                self.rotors[1].rotate()
-                self.rotors[0].rotate()
-
-                # Encrypt the letter and append it to the encrypted message
-            encrypted_message += self._encipher_letter(letter)
+        return self._encipher_normalized(self._normalize(message))
+
+    def encipher_parallel(self, message: str, workers: Optional[int] = None, chunk_size: Optional[int] = None) -> str:
+        # Encipher a long message by splitting it into chunks enciphered in a pool of worker processes. Each chunk
+        # starts from the rotor state at its offset (see state_at), so the result is identical to encipher.
+        if workers is not None and workers < 1:
+            raise EnigmaMachineInvalidWorkersException(f"Number of workers must be at least 1. Got {workers}.")
+        if chunk_size is not None:
+            _validate_chunk_size(chunk_size)
+        message = self._normalize(message)
+        workers = workers or os.cpu_count() or 1
+        if chunk_size is None:
+            chunk_size = max(-(-len(message) // workers), PARALLEL_MIN_CHUNK_SIZE)
+        if workers <= 1 or len(message) <= chunk_size:
+            return self._encipher_normalized(message)
+
+        schedule = rotor_stepping_schedule(self.rotors)
+        start = self._state_id()
+        offsets = range(0, len(message), chunk_size)
+        states = [schedule.advance(start, offset) for offset in offsets]
+        chunks = [message[offset:offset + chunk_size] for offset in offsets]
+        logger.debug(f"Enciphering {len(message)} letters in {len(chunks)} chunks across {workers} processes")
+
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_parallel_worker, initargs=(self,)) as pool:
+            encrypted_message = "".join(pool.map(_encipher_parallel_chunk, states, chunks))
+        if self._stats is not None:
+            self._record_batch("parallel", start, len(message), time.perf_counter() - started)
+
+        self._set_state_id(schedule.advance(start, len(message)))
         return encrypted_message
 
+    def encipher_chunks(self, chunks: Iterable[str]) -> Iterator[str]:
+        # Encipher an iterable of text chunks, yielding the ciphertext of each chunk as it is consumed. The rotor
+        # positions carry over from one chunk to the next, so the joined output is the same as enciphering the
+        # joined input. Removed characters are reported in a single warning once the chunks are exhausted.
+        removed: Counter[str] = Counter()
+        for chunk in chunks:
+            yield self._encipher_normalized(self._normalize(chunk, removed))
+        log_removed(removed)
+
+    def encipher_stream(self, readable: IO[str], writable: IO[str], chunk_size: int = STREAM_CHUNK_SIZE) -> int:
+        # Encipher text read from readable in chunks of chunk_size characters, writing the ciphertext to writable.
+        # Only one chunk is held in memory at a time. Returns the number of letters written.
+        _validate_chunk_size(chunk_size)
+        written = 0
+        for encrypted in self.encipher_chunks(iter(lambda: readable.read(chunk_size), "")):
+            writable.write(encrypted)
+            written += len(encrypted)
+        logger.debug(f"Enciphered stream of {written} letters")
+        return written
+
+    def encipher_into(self, src: BufferLike, dst: BufferLike) -> int:
+        # Encipher ASCII text held in any buffer (bytes, bytearray, memoryview, mmap, ...) and write the ciphertext
+        # letters into the start of the writable buffer dst. Returns the number of bytes written. Removed
+        # characters are reported in a single warning.
+        removed: Counter[str] = Counter()
+        written = self._encipher_buffer(src, dst, removed)
+        log_removed(removed)
+        return written
+
+    def _encipher_buffer(self, src: BufferLike, dst: BufferLike, removed: Counter[str]) -> int:
+        # Work through src in blocks of INTO_BLOCK_SIZE bytes, writing the ciphertext of each block straight into
+        # dst, so only one block of the source is ever copied and no ciphertext is built for the whole buffer.
+        # Removed characters are counted into removed.
+        source = memoryview(src).cast("B")
+        output = memoryview(dst).cast("B")
+        if len(output) < len(source):
+            # Check the output is large enough before writing anything or stepping the rotors
+            length = sum(count_letters(bytes(source[offset:offset + INTO_BLOCK_SIZE]))
+                         for offset in range(0, len(source), INTO_BLOCK_SIZE))
+            if length > len(output):
+                raise EnigmaMachineBufferTooSmallException(
+                    f"Output buffer holds {len(output)} bytes but the ciphertext is {length} bytes")
+
+        written = 0
+        for offset in range(0, len(source), INTO_BLOCK_SIZE):
+            letters = self._normalize_bytes(bytes(source[offset:offset + INTO_BLOCK_SIZE]), removed)
+            if letters:
+                output[written:written + len(letters)] = self._encipher_letters(letters)
+                written += len(letters)
+        return written
+
+    def encipher_file(self, src_path: str, dst_path: str, chunk_size: int = FILE_CHUNK_SIZE) -> int:
+        # Encipher an ASCII text file into another file, with both memory mapped so only one chunk of ciphertext
+        # is held in memory at a time. Returns the number of letters written. Removed characters are reported in
+        # a single warning for the whole file.
+        _validate_chunk_size(chunk_size)
+        # Opening dst truncates it, which would lose the source before it is read
+        if os.path.exists(dst_path) and os.path.samefile(src_path, dst_path):
+            raise EnigmaMachineSameFileException(f"Cannot encipher file {src_path} into itself")
+        removed: Counter[str] = Counter()
+        with open(src_path, "rb") as src_file, open(dst_path, "w+b") as dst_file:
+            size = os.fstat(src_file.fileno()).st_size
+            if size == 0:
+                return 0
+            # The ciphertext is never longer than the source, so size the output for the worst case and trim it
+            dst_file.truncate(size)
+            written = 0
+            with mmap.mmap(src_file.fileno(), 0, access=mmap.ACCESS_READ) as src, \
+                    mmap.mmap(dst_file.fileno(), 0) as dst:
+                with memoryview(src) as source, memoryview(dst) as output:
+                    for offset in range(0, size, chunk_size):
+                        written += self._encipher_buffer(source[offset:offset + chunk_size], output[written:], removed)
+                dst.flush()
+            dst_file.truncate(written)
+        log_removed(removed)
+        logger.debug(f"Enciphered file {src_path} to {dst_path}, {written} letters")
+        return written
+
     def decipher(self, message: str) -> str:
         return self.encipher(message)  # Deciphering is the same as enciphering in the Enigma Machine
 
+    def state_at(self, offset: int) -> tuple[str, ...]:
+        # Return the rotor positions after offset key presses from the initial rotor positions. Uses the cycle
+        # structure of the stepping sequence, so the cost does not depend on the offset.
+        if offset < 0:
+            raise EnigmaMachineInvalidOffsetException(f"Message offset must not be negative. Got {offset}.")
+        start = state_id(*(rotor._original_position for rotor in self.rotors))
+        state = rotor_stepping_schedule(self.rotors).advance(start, offset)
+        return tuple(ALPHABET[position] for position in state_positions(state))
+
+    def seek(self, offset: int) -> None:
+        # Set the rotors to where they would be after enciphering offset letters from the initial rotor positions,
+        # so the next letter enciphered is the letter at that offset in the message
+        positions = self.state_at(offset)
+        for rotor, position in zip(self.rotors, positions):
+            rotor.rotor_position = position
+        logger.debug(f"Seeked Enigma Machine to offset {offset}, rotor positions {''.join(positions)}")
+
+    def to_config(self) -> CompiledConfig:
+        # An immutable snapshot of the machine's configuration for the functions in pyenigma.functional, which can
+        # be shared between threads. The rotor positions are not part of it; see functional_state.
+        return compile_components(self.rotors, self.reflector, self.plugboard)
+
+    def functional_state(self) -> int:
+        # The rotor positions as the state passed to pyenigma.functional.encipher
+        return self._state_id()
+
+    def get_state(self) -> tuple[int, ...]:
+        # Capture the mutable state of the machine as a tuple of ints: the three rotor positions (A=0) followed by
+        # the plugged index of each of the 26 letters. Restoring it with set_state is much cheaper than building
+        # a new machine, which suits searches that try a change and back out of it.
+        return (*(rotor._position for rotor in self.rotors), *self.plugboard._get_wiring())
+
+    def set_state(self, state: tuple[int, ...]) -> None:
+        # Restore a state returned by get_state. A changed plugboard takes effect like any other plugboard change:
+        # a compiled machine rebuilds only its plugboard translate tables and keeps the compiled scrambler table.
+        if len(state) != STATE_LENGTH:
+            raise EnigmaMachineInvalidStateException(f"Machine state must have {STATE_LENGTH} values. Got {len(state)}.")
+        if not all(0 <= position < 26 for position in state[:3]):
+            raise EnigmaMachineInvalidStateException(f"Rotor positions must be from 0 to 25. Got {state[:3]}.")
+        wiring = state[3:]
+        # Each letter must be plugged to a letter plugged back to it, with at most MAX_CONNECTIONS pairs
+        if not all(0 <= plugged < 26 and wiring[plugged] == index for index, plugged in enumerate(wiring)):
+            raise EnigmaMachineInvalidStateException(f"Plugboard wiring must connect letters in pairs. Got {wiring}.")
+        if sum(plugged != index for index, plugged in enumerate(wiring)) > 2 * MAX_CONNECTIONS:
+            raise EnigmaMachineInvalidStateException(f"Plugboard wiring must have at most {MAX_CONNECTIONS} pairs")
+        for rotor, position in zip(self.rotors, state[:3]):
+            rotor._position = position
+        self.plugboard._set_wiring(wiring)
+
     def reset(self) -> None:
         for rotor in self.rotors:
             rotor.reset()
         logger.debug("Reset Enigma Machine")
+
+
+def _validate_chunk_size(chunk_size: int) -> None:
+    if chunk_size < 1:
+        raise EnigmaMachineInvalidChunkSizeException(f"Chunk size must be at least 1. Got {chunk_size}.")
+
+
+# Machine used by encipher_parallel worker processes, set once per worker by the pool initializer
+_parallel_worker_machine: Optional[EnigmaMachine] = None
+
+
+def _init_parallel_worker(machine: EnigmaMachine) -> None:
+    global _parallel_worker_machine
+    # Stats are collected by the calling process for the whole message
+    machine._stats = None
+    if not machine.is_compiled:
+        machine.compile()
+    _parallel_worker_machine = machine
+
+
+def _encipher_parallel_chunk(state: int, chunk: str) -> str:
+    machine = _parallel_worker_machine
+    assert machine is not None
+    machine._set_state_id(state)
+    return machine._encipher_normalized(chunk)
@@ -0,0 +1,209 @@
+import argparse
+import logging
+import math
+import mmap
+import struct
+import sys
+from array import array
+from collections import Counter
+from typing import Any, Iterable, Iterator, Optional, Sequence, Union
+from .compiled import LETTER_TO_INDEX
+from .normalize import normalize_message
+from .exceptions import NgramInvalidFileException, NgramInvalidOrderException
+from .vectorized import HAS_NUMPY, Array
+
+if HAS_NUMPY:
+    import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# An n-gram table file is a header (magic, format version, n, two padding bytes, and the floor score as a little
+# endian float32) followed by 26**n little endian float32 log10 probabilities, indexed by the base 26 value of
+# the n-gram with A=0 and the first letter most significant
+NGRAM_MAGIC = b"PYENGRAM"
+NGRAM_VERSION = 1
+_HEADER = struct.Struct("<8sBBxxf")
+
+# The longest n-grams supported. A table of 5-grams is 47 MB.
+MAX_NGRAM_ORDER = 5
+
+# Texts at least this long are scored with NumPy when it is installed
+NGRAM_VECTORIZED_MIN_LENGTH = 64
+
+# Corpus files are read this many characters at a time when building a table
+NGRAM_CHUNK_SIZE = 1 << 22
+
+
+def _check_order(n: int) -> None:
+    if not 1 <= n <= MAX_NGRAM_ORDER:
+        raise NgramInvalidOrderException(f"N-grams must be 1 to {MAX_NGRAM_ORDER} letters long, not {n}")
+
+
+def gram_indices(indices: Array, n: int) -> Array:
+    # The base 26 value of every n-gram in letter indices (A=0), along the last axis
+    length = max(indices.shape[-1] - n + 1, 0)
+    values = np.zeros(indices.shape[:-1] + (length,), dtype=np.intp)
+    if not length:
+        return values
+    for offset in range(n):
+        values = values * 26 + indices[..., offset:offset + length]
+    return values
+
+
+class NgramModel():
+    # Log10 probabilities of every n-gram as a flat array of float32 indexed by base 26 value. N-grams never seen
+    # score the floor. A model loaded from a file is memory mapped, so loading is fast and every process that
+    # loads the same file shares one copy of the table.
+    def __init__(self, n: int, floor: float, scores: Union["memoryview[float]", "array[float]"], path: Optional[str] = None) -> None:
+        _check_order(n)
+        self.n = n
+        self.floor = floor
+        self.path = path
+        self._scores = scores
+        self._array: Array = np.frombuffer(scores, dtype=np.float32) if HAS_NUMPY else None
+
+    @staticmethod
+    def from_counts(counts: Sequence[int], n: int) -> "NgramModel":
+        # Build a model from the count of each n-gram, indexed by base 26 value. The floor is the score of a
+        # hundredth of one occurrence.
+        _check_order(n)
+        if len(counts) != 26 ** n:
+            raise NgramInvalidOrderException(f"Got {len(counts)} counts for {n}-grams, expected {26 ** n}")
+        total = sum(counts) or 1
+        floor = math.log10(0.01 / total)
+        scores = array("f", (math.log10(count / total) if count else floor for count in counts))
+        return NgramModel(n, floor, scores)
+
+    @staticmethod
+    def build(texts: Iterable[str], n: int) -> "NgramModel":
+        return NgramModel.from_counts(count_ngrams(texts, n), n)
+
+    @staticmethod
+    def load(path: str) -> "NgramModel":
+        # Memory map a table written by save
+        with open(path, "rb") as file:
+            try:
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise NgramInvalidFileException(f"{path} is empty")
+        if len(data) < _HEADER.size:
+            raise NgramInvalidFileException(f"{path} is too short to be an n-gram table")
+        magic, version, n, floor = _HEADER.unpack_from(data)
+        if magic != NGRAM_MAGIC or version != NGRAM_VERSION:
+            raise NgramInvalidFileException(f"{path} is not a version {NGRAM_VERSION} n-gram table")
+        _check_order(n)
+        if len(data) != _HEADER.size + 4 * 26 ** n:
+            raise NgramInvalidFileException(f"{path} has {len(data)} bytes, expected {_HEADER.size + 4 * 26 ** n}")
+
+        scores: Union["memoryview[float]", "array[float]"] = memoryview(data)[_HEADER.size:].cast("f")
+        if sys.byteorder != "little":  # pragma: no cover
+            scores = array("f", scores)
+            scores.byteswap()
+        logger.debug(f"Loaded {n}-gram table from {path}")
+        return NgramModel(n, floor, scores, path)
+
+    def save(self, path: str) -> None:
+        scores = array("f", self._scores)
+        if sys.byteorder != "little":  # pragma: no cover
+            scores.byteswap()
+        with open(path, "wb") as file:
+            file.write(_HEADER.pack(NGRAM_MAGIC, NGRAM_VERSION, self.n, self.floor))
+            file.write(scores.tobytes())
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        # Worker processes map a loaded table from its file again instead of copying it
+        if self.path is not None:
+            return (NgramModel.load, (self.path,))
+        return (NgramModel, (self.n, self.floor, array("f", self._scores)))
+
+    def score_indices(self, indices: bytes) -> float:
+        # The summed log10 probability of every n-gram in letter indices (A=0)
+        if self._array is not None and len(indices) >= NGRAM_VECTORIZED_MIN_LENGTH:
+            return float(self._array[gram_indices(np.frombuffer(indices, dtype=np.uint8), self.n)].sum(dtype=np.float64))
+
+        scores = self._scores
+        modulus = 26 ** (self.n - 1)
+        value = 0
+        for index in indices[:self.n - 1]:
+            value = value * 26 + index
+        total = 0.0
+        for index in indices[self.n - 1:]:
+            value = value % modulus * 26 + index
+            total += scores[value]
+        return total
+
+    def score(self, text: str) -> float:
+        return self.score_indices(normalize_message(text, Counter()).encode("ascii").translate(LETTER_TO_INDEX))
+
+    def score_batch(self, texts: Sequence[bytes]) -> list[float]:
+        # Score many texts of letter indices. With NumPy, the n-grams of every text are looked up together.
+        if self._array is None:
+            return [self.score_indices(text) for text in texts]
+        joined = np.frombuffer(b"".join(texts), dtype=np.uint8)
+        totals = np.zeros(max(len(joined) - self.n + 1, 0) + 1, dtype=np.float64)
+        np.cumsum(self._array[gram_indices(joined, self.n)], dtype=np.float64, out=totals[1:])
+        results = []
+        start = 0
+        for text in texts:
+            grams = len(text) - self.n + 1
+            results.append(float(totals[start + grams] - totals[start]) if grams > 0 else 0.0)
+            start += len(text)
+        return results
+
+    def score_array(self, indices: Array) -> Array:
+        # Score each row of a 2D NumPy array of letter indices (A=0), such as candidate decryptions of equal length
+        return self._array[gram_indices(indices, self.n)].sum(axis=-1, dtype=np.float64)
+
+
+def count_ngrams(texts: Iterable[str], n: int) -> list[int]:
+    # Count the n-grams of texts read as one stream of letters, indexed by base 26 value. Everything that is not
+    # a letter is skipped, so n-grams run across spaces and from one text into the next.
+    _check_order(n)
+    size = 26 ** n
+    carry = b""
+    if HAS_NUMPY:
+        counts = np.zeros(size, dtype=np.int64)
+        for text in texts:
+            letters = carry + normalize_message(text, Counter()).encode("ascii").translate(LETTER_TO_INDEX)
+            counts += np.bincount(gram_indices(np.frombuffer(letters, dtype=np.uint8), n).ravel(), minlength=size)
+            carry = letters[-(n - 1):] if n > 1 else b""
+        return [int(count) for count in counts]
+
+    count_list = [0] * size
+    modulus = 26 ** (n - 1)
+    value = 0
+    seen = 0
+    for text in texts:
+        for index in normalize_message(text, Counter()).encode("ascii").translate(LETTER_TO_INDEX):
+            value = value % modulus * 26 + index
+            seen += 1
+            if seen >= n:
+                count_list[value] += 1
+    return count_list
+
+
+def read_chunks(paths: Iterable[str], chunk_size: int = NGRAM_CHUNK_SIZE) -> Iterator[str]:
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as file:
+            while chunk := file.read(chunk_size):
+                yield chunk
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="pyenigma ngrams", description="Build an n-gram table from text files")
+    parser.add_argument("corpus", nargs="+", help="Text files to count n-grams in")
+    parser.add_argument("-n", type=int, default=4, help="Length of the n-grams, from 1 to 5 (default 4)")
+    parser.add_argument("--output", required=True, help="File to write the table to")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    args = parse_args(argv)
+    counts = count_ngrams(read_chunks(args.corpus), args.n)
+    NgramModel.from_counts(counts, args.n).save(args.output)
+    print(f"Wrote a table of {sum(counts):,} {args.n}-grams to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
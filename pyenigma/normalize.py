@@ -0,0 +1,83 @@
+import logging
+import re
+from collections import Counter
+from typing import Optional
+from .constants import ALPHABET
+
+
+logger = logging.getLogger(__name__)
+
+# For ASCII messages, bytes.translate uppercases and strips in a single pass. The first table uppercases, and
+# the delete sets drop everything that is not a letter (for the message) or everything that is a letter or a
+# space (for the characters reported as removed).
+_UPPERCASE = bytes.maketrans(ALPHABET.lower().encode("ascii"), ALPHABET.encode("ascii"))
+_NON_LETTERS = bytes(code for code in range(256) if not chr(code).isascii() or not chr(code).isalpha())
+_LETTERS_AND_SPACE = (ALPHABET + ALPHABET.lower() + " ").encode("ascii")
+
+# Other messages are uppercased with str.upper, which can turn non-ASCII characters into letters (ß into SS)
+_NON_LETTER_PATTERN = re.compile(f"[^{ALPHABET}]+")
+_INVALID_PATTERN = re.compile(f"[^{ALPHABET} ]")
+
+
+def normalize_message(message: str, removed: Optional[Counter[str]] = None) -> str:
+    # Uppercase the message and strip everything that is not a letter, in time linear in the message length.
+    # Spaces are stripped silently. Other removed characters are counted into removed when it is given, and
+    # otherwise logged as one warning per character.
+    try:
+        data = message.encode("ascii")
+    except UnicodeEncodeError:
+        upper = message.upper()
+        normalized = _NON_LETTER_PATTERN.sub("", upper)
+        source_length = len(upper)
+        ascii_data = None
+    else:
+        normalized = data.translate(_UPPERCASE, _NON_LETTERS).decode("ascii")
+        source_length = len(data)
+        ascii_data = data
+
+    if len(normalized) == source_length:
+        return normalized
+    if removed is None and not logger.isEnabledFor(logging.WARNING):
+        return normalized
+
+    if ascii_data is not None:
+        invalid = ascii_data.translate(None, _LETTERS_AND_SPACE).decode("ascii")
+    else:
+        invalid = "".join(_INVALID_PATTERN.findall(upper))
+
+    if removed is not None:
+        removed.update(invalid)
+    else:
+        for letter in invalid:
+            logger.warning(f"Removing invalid character {letter} from message")
+    return normalized
+
+
+def normalize_bytes(data: bytes, removed: Optional[Counter[str]] = None) -> bytes:
+    # The same as normalize_message for ASCII encoded bytes, returning the letters as ASCII bytes. Bytes outside
+    # ASCII are removed like any other invalid character and reported by their Latin-1 character.
+    normalized = data.translate(_UPPERCASE, _NON_LETTERS)
+    if len(normalized) == len(data):
+        return normalized
+    if removed is None and not logger.isEnabledFor(logging.WARNING):
+        return normalized
+
+    invalid = data.translate(None, _LETTERS_AND_SPACE).decode("latin-1")
+    if removed is not None:
+        removed.update(invalid)
+    else:
+        for letter in invalid:
+            logger.warning(f"Removing invalid character {letter} from message")
+    return normalized
+
+
+def count_letters(data: bytes) -> int:
+    # The length normalize_bytes would return for data, without logging or counting the removed characters
+    return len(data.translate(None, _NON_LETTERS))
+
+
+def log_removed(removed: Counter[str]) -> None:
+    # Log a single warning summarizing the characters counted by normalize_message
+    if removed:
+        counts = ", ".join(f"{letter!r}: {count}" for letter, count in removed.most_common())
+        logger.warning(f"Removed {sum(removed.values())} invalid characters from message ({counts})")
@@ -1,27 +1,69 @@
 import logging
-from .constants import ALPHABET
+from typing import Iterable
+from .constants import ALPHABET, ALPHABET_INDEX
 from .exceptions import (
     PlugboardConnectionExistsException,
     PlugboardConnectionToItselfException,
     PlugboardInvalidLetterException,
     PlugboardTooManyConnectionsException,
-    PlugboardStringOddNumberOfLettersException
+    PlugboardStringOddNumberOfLettersException,
+    PlugboardLetterNotConnectedException,
+    PlugboardNothingToUndoException,
+    PlugboardException
 )
 
 logger = logging.getLogger(__name__)
 
+# The most pairs of letters that can be connected
+MAX_CONNECTIONS = 10
+
+# The identity wiring, with no letters connected
+_IDENTITY = bytes(range(26))
+
 
 class Plugboard():
+    __slots__ = ("_wiring", "_pair_count", "_undo")
+
     def __init__(self) -> None:
-        self.connections: dict[str, str] = {}
+        # The wiring holds the index (A=0) each letter index is connected to, its own index when it is not
+        # connected. Every change is a few byte writes, and the undo stack holds the wiring before each swap,
+        # unswap and replace_pair.
+        self._wiring = bytearray(_IDENTITY)
+        self._pair_count = 0
+        self._undo: list[tuple[bytes, int]] = []
         logger.debug("Initialized Plugboard")
 
+    @staticmethod
+    def from_pairs(pairs: Iterable[tuple[int, int]]) -> "Plugboard":
+        # Construct a plugboard from pairs of letter indices (A=0) known to be valid: distinct letters, each used
+        # once, at most 10 pairs. Nothing is checked or logged.
+        plugboard = Plugboard.__new__(Plugboard)
+        plugboard._wiring = bytearray(_IDENTITY)
+        plugboard._pair_count = 0
+        plugboard._undo = []
+        for index1, index2 in pairs:
+            plugboard._connect(index1, index2)
+        return plugboard
+
+    @staticmethod
+    def from_wiring(wiring: bytes) -> "Plugboard":
+        # Construct a plugboard from a wiring returned by wiring(), without checking it
+        plugboard = Plugboard.__new__(Plugboard)
+        plugboard._wiring = bytearray(wiring)
+        plugboard._pair_count = sum(plugged != index for index, plugged in enumerate(wiring)) // 2
+        plugboard._undo = []
+        return plugboard
+
+    @property
+    def connections(self) -> dict[str, str]:
+        # The connected letters, with an entry for both letters of each pair
+        return {ALPHABET[index]: ALPHABET[plugged] for index, plugged in enumerate(self._wiring) if plugged != index}
+
     def add_connection(self, letter1: str, letter2: str) -> None:
         self._validate_plugboard_connection(letter1, letter2)
 
         # Add the connection
-        self.connections[letter1] = letter2
-        self.connections[letter2] = letter1
+        self._connect(ALPHABET_INDEX[letter1], ALPHABET_INDEX[letter2])
 
     def add_connection_from_map(self, connection_map: dict[str, str]) -> None:
         for letter1, letter2 in connection_map.items():
@@ -38,14 +80,96 @@ class Plugboard():
             letter2 = connection_string[i + 1]
             self.add_connection(letter1, letter2)
 
+    def swap(self, letter1: str, letter2: str) -> None:
+        # Connect two letters, the same as add_connection. The change can be reverted with undo.
+        self._validate_plugboard_connection(letter1, letter2)
+        self._save()
+        self._connect(ALPHABET_INDEX[letter1], ALPHABET_INDEX[letter2])
+
+    def unswap(self, letter: str) -> None:
+        # Disconnect a letter from the letter it is connected to. The change can be reverted with undo.
+        index = self._connected_index(letter)
+        self._save()
+        self._disconnect(index)
+
+    def replace_pair(self, letter: str, letter1: str, letter2: str) -> None:
+        # Disconnect letter from its pair and connect letter1 to letter2 in its place, as a single change that
+        # undo reverts. Either new letter may be one of the disconnected pair. Nothing changes if it fails.
+        index = self._connected_index(letter)
+        self._save()
+        self._disconnect(index)
+        try:
+            self._validate_plugboard_connection(letter1, letter2)
+        except PlugboardException:
+            self._restore(self._undo.pop())
+            raise
+        self._connect(ALPHABET_INDEX[letter1], ALPHABET_INDEX[letter2])
+
+    def undo(self) -> None:
+        # Revert the most recent change made by swap, unswap or replace_pair
+        if not self._undo:
+            raise PlugboardNothingToUndoException("There are no plugboard changes to undo")
+        self._restore(self._undo.pop())
+
+    def clear_undo(self) -> None:
+        # Forget the changes recorded for undo, keeping the current connections. Search loops that keep a change
+        # should call this so the undo stack does not keep growing.
+        self._undo.clear()
+
     def translate(self, letter: str) -> str:
-        val = self.connections.get(letter, letter)
-        logger.debug(f"Plugboard translated letter {letter} to {val}")
-        return val
+        index = ALPHABET_INDEX.get(letter)
+        return letter if index is None else ALPHABET[self._wiring[index]]
+
+    def translation_table(self) -> bytes:
+        # A 256 byte bytes.translate table swapping the ASCII codes of connected letters, leaving every other byte
+        return bytes.maketrans(ALPHABET.encode("ascii"), bytes(ord("A") + plugged for plugged in self._wiring))
+
+    def wiring(self) -> bytes:
+        # The connected index of each letter index (A=0), for the table driven engines
+        return bytes(self._wiring)
+
+    def _get_wiring(self) -> tuple[int, ...]:
+        return tuple(self._wiring)
+
+    def _set_wiring(self, wiring: tuple[int, ...]) -> None:
+        # Replace the connections with those of a wiring returned by _get_wiring. The wiring is trusted to be one.
+        # The changes recorded for undo led to the old wiring, so they are forgotten.
+        self._wiring[:] = bytes(wiring)
+        self._pair_count = sum(plugged != index for index, plugged in enumerate(wiring)) // 2
+        self._undo.clear()
+
+    def _connected_index(self, letter: str) -> int:
+        index = ALPHABET_INDEX.get(letter)
+        if index is None:
+            raise PlugboardInvalidLetterException(f"Letter {letter} is not a valid letter in the alphabet")
+        if self._wiring[index] == index:
+            raise PlugboardLetterNotConnectedException(f"Letter {letter} is not connected")
+        return index
+
+    def _connect(self, index1: int, index2: int) -> None:
+        self._wiring[index1] = index2
+        self._wiring[index2] = index1
+        self._pair_count += 1
+
+    def _disconnect(self, index: int) -> None:
+        plugged = self._wiring[index]
+        self._wiring[index] = index
+        self._wiring[plugged] = plugged
+        self._pair_count -= 1
+
+    def _save(self) -> None:
+        self._undo.append((bytes(self._wiring), self._pair_count))
+
+    def _restore(self, saved: tuple[bytes, int]) -> None:
+        self._wiring[:], self._pair_count = saved
+
+    def _is_connected(self, letter: str) -> bool:
+        index = ALPHABET_INDEX.get(letter)
+        return index is not None and self._wiring[index] != index
 
     def _validate_plugboard_connection(self, letter1: str, letter2: str) -> None:
         # Check if a connection for either letter already exists
-        if letter1 in self.connections or letter2 in self.connections:
+        if self._is_connected(letter1) or self._is_connected(letter2):
             raise PlugboardConnectionExistsException(f"Connection for letter {letter1} or {letter2} already exists")
 
         # Check that the connection is not to itself
@@ -53,9 +177,9 @@ class Plugboard():
             raise PlugboardConnectionToItselfException("Cannot connect a letter to itself")
 
         # Check that the connection is not to an invalid letter
-        if letter1 not in ALPHABET or letter2 not in ALPHABET:
+        if letter1 not in ALPHABET_INDEX or letter2 not in ALPHABET_INDEX:
             raise PlugboardInvalidLetterException(f"Letter {letter1} or {letter2} is not a valid letter in the alphabet")
 
         # Check that there are not more than 10 connections (20 letters in total)
-        if len(self.connections) >= 20:
+        if self._pair_count >= MAX_CONNECTIONS:
             raise PlugboardTooManyConnectionsException("Cannot have more than 10 connections")
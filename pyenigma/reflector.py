@@ -1,4 +1,7 @@
 import logging
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Mapping
 from pyenigma.constants import ALPHABET, REFLECTOR_WIRING
 from pyenigma.exceptions import (
     ReflectorWiringWrongLengthException,
@@ -9,18 +12,28 @@ from pyenigma.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Wiring maps are shared by all reflectors with the same wiring. The standard reflectors need 2 entries, the rest
+# of the cache is for custom wirings.
+REFLECTOR_MAP_CACHE_SIZE = 256
+
 
 class Reflector():
+    __slots__ = ("_wiring", "_wiring_map")
+
     def __init__(self, reflector_wiring: str, reflector_model: str = "Custom") -> None:
-        self._validate_reflector_wiring(reflector_wiring)
         self._wiring = reflector_wiring
-        self._wiring_map = {k: v for k, v in zip(ALPHABET, reflector_wiring)}
-        logger.debug(f"Initialized Reflector model {reflector_model} with wiring {reflector_wiring}")
+        self._wiring_map = self._shared_wiring_map(reflector_wiring)
+        logger.debug("Initialized Reflector model %s with wiring %s", reflector_model, reflector_wiring)
 
     def reflect(self, letter: str) -> str:
-        val = self._wiring_map[letter]
-        logger.debug(f"Reflector reflected letter {letter} to {val}")
-        return val
+        return self._wiring_map[letter]
+
+    @staticmethod
+    @lru_cache(maxsize=REFLECTOR_MAP_CACHE_SIZE)
+    def _shared_wiring_map(reflector_wiring: str) -> Mapping[str, str]:
+        # Validate the wiring and build its map once. The map is shared, so it is wrapped in a read-only proxy.
+        Reflector._validate_reflector_wiring(reflector_wiring)
+        return MappingProxyType({k: v for k, v in zip(ALPHABET, reflector_wiring)})
 
     @staticmethod
     def _validate_reflector_wiring(reflector_wiring: str) -> None:
@@ -49,3 +62,17 @@ class Reflector():
             return Reflector(REFLECTOR_WIRING[reflector_model], reflector_model)
         except KeyError:
             raise ReflectorInvalidModelException(f"Invalid reflector model {reflector_model}")
+
+    @staticmethod
+    def trusted(reflector_wiring: str) -> "Reflector":
+        # Construct a reflector from a wiring known to be valid without checking or logging. The wiring is only
+        # checked the first time it is seen, when its map is built.
+        reflector = Reflector.__new__(Reflector)
+        reflector._wiring = reflector_wiring
+        reflector._wiring_map = Reflector._shared_wiring_map(reflector_wiring)
+        return reflector
+
+    @staticmethod
+    def from_model(reflector_model: str) -> "Reflector":
+        # The trusted version of get_reflector for a standard reflector model
+        return Reflector.trusted(REFLECTOR_WIRING[reflector_model])
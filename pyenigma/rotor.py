@@ -1,5 +1,6 @@
 import logging
-from pyenigma.constants import ALPHABET, ROTOR_WIRING, ROTOR_NOTCHES
+from functools import lru_cache
+from pyenigma.constants import ALPHABET, ALPHABET_INDEX, ROTOR_WIRING, ROTOR_NOTCHES
 from pyenigma.exceptions import (
     RotorWiringWrongLengthException,
     RotorWiringDuplicateLettersException,
@@ -10,19 +11,71 @@ from pyenigma.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# Precomputed tables are shared by all rotors with the same wiring and ring setting. The standard rotors need
+# 5 x 26 entries, the rest of the cache is for custom wirings.
+ROTOR_TABLE_CACHE_SIZE = 1024
+
+# Translation tables of every rotor position, indexed [position][index]
+RotorTables = tuple[tuple[int, ...], ...]
+
 
 class Rotor():
+    __slots__ = ("_forward_tables", "_backward_tables", "_wiring", "notch", "_ring_setting", "_ring_offset",
+                 "_position", "_original_position", "_rotor_model")
+
     def __init__(self, rotor_wiring: str, rotor_notch: str, ring_setting: str = "A", initial_rotor_position: str = "A", rotor_model: str = "Custom") -> None:
-        self._validate_rotor_wiring(rotor_wiring)
+        # The tables are immutable and shared, so only the position belongs to this rotor
+        self._forward_tables, self._backward_tables = self._shared_tables(rotor_wiring, ring_setting)
         self._wiring = rotor_wiring
         self.notch = rotor_notch
         self._ring_setting = ring_setting
-        self.rotor_position = initial_rotor_position
-        self._original_rotor_position = initial_rotor_position
-        self._wiring_map = {k: v for k, v in zip(ALPHABET, rotor_wiring)}
-        self._reverse_wiring_map = {v: k for k, v in zip(ALPHABET, rotor_wiring)}
+        self._ring_offset = ALPHABET_INDEX[ring_setting]
+        self._position = self._letter_to_index(initial_rotor_position)
+        self._original_position = self._position
         self._rotor_model = rotor_model
-        logger.debug(f"Rotor model {self._rotor_model} initialized")
+        logger.debug("Rotor model %s initialized", rotor_model)
+
+    @property
+    def rotor_position(self) -> str:
+        return ALPHABET[self._position]
+
+    @rotor_position.setter
+    def rotor_position(self, letter: str) -> None:
+        self._position = self._letter_to_index(letter)
+
+    @staticmethod
+    def _letter_to_index(letter: str) -> int:
+        try:
+            return ALPHABET_INDEX[letter]
+        except KeyError:
+            raise RotorInvalidLetterException(f"Rotor setting {letter} is not a valid letter in the alphabet")
+
+    @staticmethod
+    @lru_cache(maxsize=ROTOR_TABLE_CACHE_SIZE)
+    def _shared_tables(rotor_wiring: str, ring_setting: str) -> tuple[RotorTables, RotorTables]:
+        # Validate the wiring and ring setting and build the tables once per combination. Invalid settings raise
+        # and are not cached.
+        Rotor._validate_rotor_wiring(rotor_wiring)
+        forward_tables, backward_tables = Rotor._build_tables(rotor_wiring, Rotor._letter_to_index(ring_setting))
+        return tuple(map(tuple, forward_tables)), tuple(map(tuple, backward_tables))
+
+    @staticmethod
+    def _build_tables(rotor_wiring: str, ring_offset: int) -> tuple[list[list[int]], list[list[int]]]:
+        # Precompute the forward (right to left) and backward (left to right) translation of every input index
+        # for each of the 26 rotor positions. The rotor position and ring setting only ever appear as their
+        # difference, which shifts the entry contact before the wiring and shifts the exit contact back after it.
+        wiring = [ALPHABET_INDEX[letter] for letter in rotor_wiring]
+        reverse_wiring = [0] * len(ALPHABET)
+        for index, wired_index in enumerate(wiring):
+            reverse_wiring[wired_index] = index
+
+        forward_tables = []
+        backward_tables = []
+        for position in range(len(ALPHABET)):
+            shift = position - ring_offset
+            forward_tables.append([(wiring[(index + shift) % 26] - shift) % 26 for index in range(26)])
+            backward_tables.append([(reverse_wiring[(index + shift) % 26] - shift) % 26 for index in range(26)])
+        return forward_tables, backward_tables
 
     @staticmethod
     def _shift_alphabet(letter: str) -> str:
@@ -37,8 +90,7 @@ class Rotor():
         # Ex. Input of A, ring setting of B, rotor position of A, function output is Z
         # Ex. Input of A, ring setting of C, rotor position of A, function output is Y
         # Ex. Input of A, ring setting of A, rotor position of B, function output is B
-        alphabet = self._shift_alphabet(self.rotor_position)
-        return alphabet[(alphabet.index(letter) - alphabet.index(self._ring_setting)) % len(alphabet)]
+        return ALPHABET[(ALPHABET_INDEX[letter] + self._position - self._ring_offset) % 26]
 
     def _get_ring_setting_offset_reversed(self, letter: str) -> str:
         # Get the offset of the ring setting for a given letter based on the rotor position and ring setting combined.
@@ -48,44 +100,33 @@ class Rotor():
         # Ex. Input of A, ring setting of B, rotor position of A, function output is B
         # Ex. Input of A, ring setting of C, rotor position of A, function output is C
         # Ex. Input of A, ring setting of A, rotor position of B, function output is Z
-        alphabet = self._shift_alphabet(self.rotor_position)
-        return alphabet[(alphabet.index(letter) + alphabet.index(self._ring_setting)) % len(alphabet)]
+        return ALPHABET[(ALPHABET_INDEX[letter] - self._position + self._ring_offset) % 26]
+
+    def pass_forward_index(self, index: int) -> int:
+        # Pass a letter index (A=0) through the rotor from right to left using the precomputed table
+        return self._forward_tables[self._position][index]
+
+    def pass_backward_index(self, index: int) -> int:
+        # Pass a letter index (A=0) through the rotor from left to right using the precomputed table
+        return self._backward_tables[self._position][index]
 
     def pass_forward(self, letter: str) -> str:
         # Pass the letter through the rotor from right to left and return the translated letter
-        logger.debug(f"Passing letter {letter} forward through rotor {self._rotor_model} from right to left. Current rotor position is {
-            self.rotor_position}, ring setting is {self._ring_setting}")
-        entry_position = self._get_ring_setting_offset(letter)
-        logger.debug(f"Rotor adjusted entry position is {entry_position}")
-        translated_letter = self._wiring_map[entry_position]
-        logger.debug(f"Rotor translated letter is {translated_letter}")
-        exit_position = self._get_ring_setting_offset_reversed(translated_letter)
-        logger.debug(f"Rotor adjusted exit position is {exit_position}")
-        return exit_position
+        return ALPHABET[self._forward_tables[self._position][ALPHABET_INDEX[letter]]]
 
     def pass_backward(self, letter: str) -> str:
         # Pass the letter through the rotor from left to right and return the translated letter
-        logger.debug(f"Passing letter {letter} backward through rotor {self._rotor_model} from left to right. Current rotor position is {
-            self.rotor_position}, ring setting is {self._ring_setting}")
-        entry_position = self._get_ring_setting_offset(letter)
-        logger.debug(f"Rotor adjusted entry position is {entry_position}")
-        translated_letter = self._reverse_wiring_map[entry_position]
-        logger.debug(f"Rotor translated letter is {translated_letter}")
-        exit_position = self._get_ring_setting_offset_reversed(translated_letter)
-        logger.debug(f"Rotor adjusted exit position is {exit_position}")
-        return exit_position
+        return ALPHABET[self._backward_tables[self._position][ALPHABET_INDEX[letter]]]
 
     def rotate(self) -> None:
-        # Rotate the rotor by one position by setting the rotor position to the next letter in the alphabet
-        new_position = ALPHABET[(ALPHABET.index(self.rotor_position) + 1) % len(ALPHABET)]
-        logger.debug(f"Rotating rotor {self._rotor_model} from position {self.rotor_position} to position {new_position}")
-        self.rotor_position = new_position
+        # Rotate the rotor by one position, wrapping around from Z to A
+        self._position = (self._position + 1) % 26
 
     def reset(self) -> None:
         # Reset the rotor position to the initial position
         logger.debug(f"Resetting rotor {self._rotor_model} from position {
-            self.rotor_position} to original position {self._original_rotor_position}")
-        self.rotor_position = self._original_rotor_position
+            self.rotor_position} to original position {ALPHABET[self._original_position]}")
+        self._position = self._original_position
 
     @staticmethod
     def _validate_rotor_wiring(rotor_wiring: str) -> None:
@@ -126,3 +167,25 @@ class Rotor():
             return Rotor(ROTOR_WIRING[rotor_model], ROTOR_NOTCHES[rotor_model], ring_setting, initial_rotor_position, rotor_model)
         except KeyError:
             raise RotorInvalidModelException(f"Invalid rotor model {rotor_model}")
+
+    @staticmethod
+    def trusted(rotor_wiring: str, rotor_notch: str, ring_offset: int = 0, position: int = 0, rotor_model: str = "Custom") -> "Rotor":
+        # Construct a rotor from settings that are known to be valid, such as ones already checked or enumerated by
+        # a search, with the ring setting and position as indices (A=0). Nothing is checked or logged; invalid
+        # settings give a broken rotor rather than an exception. The wiring is only checked the first time it is
+        # seen, when its tables are built.
+        rotor = Rotor.__new__(Rotor)
+        rotor._ring_setting = ALPHABET[ring_offset]
+        rotor._forward_tables, rotor._backward_tables = Rotor._shared_tables(rotor_wiring, rotor._ring_setting)
+        rotor._wiring = rotor_wiring
+        rotor.notch = rotor_notch
+        rotor._ring_offset = ring_offset
+        rotor._position = position
+        rotor._original_position = position
+        rotor._rotor_model = rotor_model
+        return rotor
+
+    @staticmethod
+    def from_indices(rotor_model: str, ring_offset: int = 0, position: int = 0) -> "Rotor":
+        # The trusted version of get_rotor, for a standard rotor model with the ring setting and position as indices
+        return Rotor.trusted(ROTOR_WIRING[rotor_model], ROTOR_NOTCHES[rotor_model], ring_offset, position, rotor_model)
@@ -0,0 +1,153 @@
+import math
+from typing import Any, Callable, Optional
+
+# The paths a batch of letters can be enciphered by, see EnigmaMachine._encipher_letters
+ENCIPHER_PATHS = ("traced", "vectorized", "compiled", "per_letter", "parallel")
+
+# Called with a dict describing each batch of letters enciphered (see MachineStats.record_batch)
+BatchCallback = Callable[[dict[str, Any]], None]
+
+
+class MachineStats():
+    # Counters collected by an EnigmaMachine while stats are enabled (see EnigmaMachine.set_stats). A batch is
+    # one call through the machine's encipher paths, such as one encipher call or one chunk of a stream.
+    def __init__(self, callback: Optional[BatchCallback] = None) -> None:
+        self.callback = callback
+        self.reset()
+
+    def reset(self) -> None:
+        self.letters = 0
+        self.batches = 0
+        self.middle_steps = 0
+        self.double_steps = 0
+        self.compiles = 0
+        self.compile_time = 0.0
+        self.compile_cache_hits = 0
+        self.compile_cache_misses = 0
+        self.plugboard_reuses = 0
+        self.plugboard_relabels = 0
+        self.normalize_time = 0.0
+        self.encipher_time = 0.0
+        self.paths = dict.fromkeys(ENCIPHER_PATHS, 0)
+
+    def record_compile(self, seconds: float, cached: bool) -> None:
+        # A compile is a cache hit when its scrambler table was already in the compiled table cache
+        self.compiles += 1
+        self.compile_time += seconds
+        if cached:
+            self.compile_cache_hits += 1
+        else:
+            self.compile_cache_misses += 1
+
+    def record_plugboard_check(self, relabelled: bool) -> None:
+        # A compiled batch either reuses the plugboard translate tables as they were, or relabels (rebuilds them)
+        # because the plugboard changed. The compiled scrambler table is kept either way.
+        if relabelled:
+            self.plugboard_relabels += 1
+        else:
+            self.plugboard_reuses += 1
+
+    def record_batch(self, path: str, letters: int, middle_steps: int, double_steps: int, seconds: float) -> None:
+        self.letters += letters
+        self.batches += 1
+        self.middle_steps += middle_steps
+        self.double_steps += double_steps
+        self.encipher_time += seconds
+        self.paths[path] += 1
+        if self.callback is not None:
+            self.callback({
+                "path": path,
+                "letters": letters,
+                "middle_steps": middle_steps,
+                "double_steps": double_steps,
+                "encipher_time": seconds,
+            })
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "letters": self.letters,
+            "batches": self.batches,
+            "middle_steps": self.middle_steps,
+            "double_steps": self.double_steps,
+            "compiles": self.compiles,
+            "compile_time": self.compile_time,
+            "compile_cache_hits": self.compile_cache_hits,
+            "compile_cache_misses": self.compile_cache_misses,
+            "plugboard_reuses": self.plugboard_reuses,
+            "plugboard_relabels": self.plugboard_relabels,
+            "normalize_time": self.normalize_time,
+            "encipher_time": self.encipher_time,
+            "paths": dict(self.paths),
+        }
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Callbacks are often lambdas or closures, which cannot be sent to encipher_parallel worker processes
+        state = self.__dict__.copy()
+        state["callback"] = None
+        return state
+
+
+class CheckpointStats():
+    # The running scores of the candidates that reached one checkpoint of a pruned evaluation
+    def __init__(self) -> None:
+        self.reached = 0
+        self.pruned = 0
+        self.score_sum = 0.0
+        self.score_squares = 0.0
+        self.score_min = math.inf
+        self.score_max = -math.inf
+
+    def record(self, score: float, pruned: bool) -> None:
+        self.reached += 1
+        self.pruned += pruned
+        self.score_sum += score
+        self.score_squares += score * score
+        self.score_min = min(self.score_min, score)
+        self.score_max = max(self.score_max, score)
+
+    def snapshot(self) -> dict[str, Any]:
+        mean = self.score_sum / self.reached if self.reached else None
+        return {
+            "reached": self.reached,
+            "pruned": self.pruned,
+            "score_mean": mean,
+            "score_stdev": (math.sqrt(max(self.score_squares / self.reached - mean * mean, 0.0))
+                            if mean is not None else None),
+            "score_min": self.score_min if self.reached else None,
+            "score_max": self.score_max if self.reached else None,
+        }
+
+
+class PruneStats():
+    # Counters collected by pyenigma.evaluate.evaluate_keys. The running scores at each checkpoint (keyed by the
+    # letters deciphered so far) show where to set a threshold: below the scores of right keys, above most others.
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self.evaluated = 0
+        self.completed = 0
+        self.pruned = 0
+        self.letters = 0
+        self.message_letters = 0
+        self.checkpoints: dict[int, CheckpointStats] = {}
+
+    def record_checkpoint(self, letters: int, score: float, pruned: bool) -> None:
+        self.checkpoints.setdefault(letters, CheckpointStats()).record(score, pruned)
+
+    def record_candidate(self, letters: int, message_letters: int, completed: bool) -> None:
+        self.evaluated += 1
+        self.completed += completed
+        self.pruned += not completed
+        self.letters += letters
+        self.message_letters += message_letters
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "evaluated": self.evaluated,
+            "completed": self.completed,
+            "pruned": self.pruned,
+            "letters": self.letters,
+            "letters_saved": self.message_letters - self.letters,
+            "checkpoints": {letters: stats.snapshot() for letters, stats in sorted(self.checkpoints.items())},
+        }
@@ -0,0 +1,173 @@
+import logging
+from functools import lru_cache
+from .rotor import Rotor
+from .constants import ALPHABET_INDEX
+
+
+logger = logging.getLogger(__name__)
+
+# Every combination of the three rotor positions is one machine state. A state id packs the positions as
+# left * 676 + middle * 26 + right, so ids run from 0 (AAA) to STATE_COUNT - 1 (ZZZ).
+STATE_COUNT = 26 ** 3
+
+
+def state_id(left: int, middle: int, right: int) -> int:
+    return left * 676 + middle * 26 + right
+
+
+def state_positions(state: int) -> tuple[int, int, int]:
+    return state // 676, state // 26 % 26, state % 26
+
+
+@lru_cache(maxsize=None)
+def stepping_table(middle_notches: str, right_notches: str) -> tuple[int, ...]:
+    # Build the state reached after one key press from every state. Only the notches of the middle and right
+    # rotors affect stepping. Each notch string holds one letter per notch, the letter that follows the notch,
+    # so rotors with several notches are supported.
+    # The rules are the same as EnigmaMachine.encipher:
+    #  - The right rotor always steps
+    #  - If the right rotor stepped onto a letter following one of its notches, the middle rotor steps
+    #  - Otherwise, if the middle rotor is one position before a letter following one of its notches, the middle
+    #    and left rotors both step (the double stepping anomaly)
+    middle_turnovers = {(ALPHABET_INDEX[notch] - 1) % 26 for notch in middle_notches if notch in ALPHABET_INDEX}
+    right_carries = {ALPHABET_INDEX[notch] for notch in right_notches if notch in ALPHABET_INDEX}
+
+    table = []
+    for state in range(STATE_COUNT):
+        left, middle, right = state_positions(state)
+        right = (right + 1) % 26
+        if right in right_carries:
+            middle = (middle + 1) % 26
+        elif middle in middle_turnovers:
+            middle = (middle + 1) % 26
+            left = (left + 1) % 26
+        table.append(state_id(left, middle, right))
+
+    logger.debug(f"Built stepping table for middle notches {middle_notches} and right notches {right_notches}")
+    return tuple(table)
+
+
+def rotor_stepping_table(rotors: list[Rotor]) -> tuple[int, ...]:
+    return stepping_table(rotors[1].notch, rotors[2].notch)
+
+
+class SteppingSchedule():
+    # The stepping table is a function from states to states, so the sequence of states from any start runs along
+    # a short tail into a cycle (16,900 states long for single notch rotors because of double stepping). Recording
+    # the cycles and the distance of every state from its cycle lets the state after any number of key presses be
+    # found with a modulo instead of walking the table.
+    def __init__(self, next_state: tuple[int, ...]) -> None:
+        self.cycles: list[tuple[int, ...]] = []
+        cycle_of = [-1] * STATE_COUNT
+        cycle_index = [-1] * STATE_COUNT
+        tail = [0] * STATE_COUNT
+        entry = list(range(STATE_COUNT))
+
+        for start in range(STATE_COUNT):
+            if cycle_of[start] >= 0:
+                continue
+            # Follow the table until reaching a state whose cycle is known, or one already on this path
+            path: list[int] = []
+            on_path: dict[int, int] = {}
+            state = start
+            while cycle_of[state] < 0 and state not in on_path:
+                on_path[state] = len(path)
+                path.append(state)
+                state = next_state[state]
+
+            if cycle_of[state] < 0:
+                # Found a new cycle; the part of the path before it is its tail
+                cycle = tuple(path[on_path[state]:])
+                for index, cycle_state in enumerate(cycle):
+                    cycle_of[cycle_state] = len(self.cycles)
+                    cycle_index[cycle_state] = index
+                self.cycles.append(cycle)
+                path = path[:on_path[state]]
+
+            for tail_state in reversed(path):
+                following = next_state[tail_state]
+                cycle_of[tail_state] = cycle_of[following]
+                tail[tail_state] = tail[following] + 1
+                entry[tail_state] = entry[following]
+
+        self._next_state = next_state
+        self._cycle_of = tuple(cycle_of)
+        self._cycle_index = tuple(cycle_index)
+        self._tail = tuple(tail)
+        self._entry = tuple(entry)
+        self._step_prefixes: dict[int, tuple[list[int], list[int]]] = {}
+        logger.debug(f"Built stepping schedule with {len(self.cycles)} cycles")
+
+    def advance(self, state: int, presses: int) -> int:
+        # Return the state after the given number of key presses from state
+        tail = self._tail[state]
+        if presses < tail:
+            # Tails are only a few states long, so walking them is cheap
+            for _ in range(presses):
+                state = self._next_state[state]
+            return state
+
+        entry = self._entry[state]
+        cycle = self.cycles[self._cycle_of[entry]]
+        return cycle[(self._cycle_index[entry] + presses - tail) % len(cycle)]
+
+    def _step_kind(self, state: int) -> tuple[int, int]:
+        # Whether the key press from state steps the middle rotor only, or the middle and left rotors together
+        # (a double step), as a pair of 0/1 counts
+        following = self._next_state[state]
+        if following // 676 != state // 676:
+            return 0, 1
+        if following // 26 != state // 26:
+            return 1, 0
+        return 0, 0
+
+    def _cycle_step_prefix(self, cycle_number: int) -> tuple[list[int], list[int]]:
+        # Running totals of middle steps and double steps along a cycle, built on first use
+        prefixes = self._step_prefixes.get(cycle_number)
+        if prefixes is None:
+            middle_prefix = [0]
+            double_prefix = [0]
+            for state in self.cycles[cycle_number]:
+                middle, double = self._step_kind(state)
+                middle_prefix.append(middle_prefix[-1] + middle)
+                double_prefix.append(double_prefix[-1] + double)
+            prefixes = self._step_prefixes[cycle_number] = middle_prefix, double_prefix
+        return prefixes
+
+    def step_counts(self, state: int, presses: int) -> tuple[int, int]:
+        # Return how many of the given number of key presses from state step the middle rotor alone, and how many
+        # step the middle and left rotors together. Like advance, the cost does not depend on presses.
+        middle_steps = double_steps = 0
+        while presses > 0 and self._tail[state] > 0:
+            middle, double = self._step_kind(state)
+            middle_steps += middle
+            double_steps += double
+            state = self._next_state[state]
+            presses -= 1
+        if presses == 0:
+            return middle_steps, double_steps
+
+        middle_prefix, double_prefix = self._cycle_step_prefix(self._cycle_of[state])
+        start = self._cycle_index[state]
+        return (middle_steps + self._count_along_cycle(middle_prefix, start, presses),
+                double_steps + self._count_along_cycle(double_prefix, start, presses))
+
+    @staticmethod
+    def _count_along_cycle(prefix: list[int], start: int, presses: int) -> int:
+        # Sum the events of the given number of key presses from index start of a cycle, using its running totals
+        length = len(prefix) - 1
+        laps, remainder = divmod(presses, length)
+        end = start + remainder
+        count = laps * prefix[length]
+        if end <= length:
+            return count + prefix[end] - prefix[start]
+        return count + prefix[length] - prefix[start] + prefix[end - length]
+
+
+@lru_cache(maxsize=None)
+def stepping_schedule(middle_notches: str, right_notches: str) -> SteppingSchedule:
+    return SteppingSchedule(stepping_table(middle_notches, right_notches))
+
+
+def rotor_stepping_schedule(rotors: list[Rotor]) -> SteppingSchedule:
+    return stepping_schedule(rotors[1].notch, rotors[2].notch)
@@ -0,0 +1,134 @@
+import logging
+from functools import lru_cache
+from typing import Any, Optional
+from .rotor import Rotor
+from .reflector import Reflector
+from .plugboard import Plugboard
+from .compiled import plugboard_indices, reflector_indices
+from .stepping import SteppingSchedule, stepping_schedule
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:  # pragma: no cover
+    HAS_NUMPY = False
+
+
+logger = logging.getLogger(__name__)
+
+# Messages at least this long are enciphered with NumPy when it is installed. Below this, setting up the arrays
+# costs more than the per-letter loop.
+VECTORIZED_MIN_LENGTH = 1_000
+
+# Longer messages are enciphered in blocks of this many letters, so the temporary arrays (several bytes per letter)
+# stay a fixed size
+VECTORIZED_BLOCK_SIZE = 1 << 20
+
+# NumPy arrays are typed as Any so that this module type checks whether or not NumPy is installed
+Array = Any
+
+
+@lru_cache(maxsize=None)
+def _cycle_array(middle_notches: str, right_notches: str, cycle: int) -> Array:
+    return np.array(stepping_schedule(middle_notches, right_notches).cycles[cycle], dtype=np.intp)
+
+
+def state_sequence(rotors: list[Rotor], start: int, count: int) -> Array:
+    return notch_state_sequence(rotors[1].notch, rotors[2].notch, start, count)
+
+
+def notch_state_sequence(middle_notches: str, right_notches: str, start: int, count: int) -> Array:
+    # Return the state after each of count key presses from start, as an array. The short tail before the
+    # stepping cycle is walked, and the rest is read from the cycle with a single gather.
+    schedule: SteppingSchedule = stepping_schedule(middle_notches, right_notches)
+    states = np.empty(count, dtype=np.intp)
+    state = start
+    index = 0
+    while index < count and schedule._tail[state] > 0:
+        state = schedule._next_state[state]
+        states[index] = state
+        index += 1
+
+    if index < count:
+        cycle = _cycle_array(middle_notches, right_notches, schedule._cycle_of[state])
+        offsets = np.arange(schedule._cycle_index[state] + 1, schedule._cycle_index[state] + 1 + count - index)
+        states[index:] = cycle[offsets % len(cycle)]
+    return states
+
+
+def encipher_indices(
+    rotors: list[Rotor],
+    reflector: Reflector,
+    plugboard: Plugboard,
+    start: int,
+    indices: Array,
+    compiled_table: Optional[bytes] = None,
+) -> tuple[Array, int]:
+    # Encipher a uint8 array of letter indices (A=0) from the rotor state start, returning the enciphered indices
+    # and the final state. Uses the compiled scrambler table, between two plugboard gathers, when one is given.
+    # Otherwise gathers through the stacked rotor, reflector and plugboard tables of every position at once.
+    if len(indices) == 0:
+        return np.empty(0, dtype=np.uint8), start
+    states = state_sequence(rotors, start, len(indices))
+    plugboard_table = np.array(plugboard_indices(plugboard), dtype=np.uint8)
+
+    if compiled_table is not None:
+        table = np.frombuffer(compiled_table, dtype=np.uint8)
+        return plugboard_table[table[states * 26 + plugboard_table[indices]]], int(states[-1])
+
+    left, middle, right = states // 676, states // 26 % 26, states % 26
+    left_rotor, middle_rotor, right_rotor = rotors
+
+    letters = plugboard_table[indices]
+    letters = np.array(right_rotor._forward_tables, dtype=np.uint8)[right, letters]
+    letters = np.array(middle_rotor._forward_tables, dtype=np.uint8)[middle, letters]
+    letters = np.array(left_rotor._forward_tables, dtype=np.uint8)[left, letters]
+    letters = np.array(reflector_indices(reflector), dtype=np.uint8)[letters]
+    letters = np.array(left_rotor._backward_tables, dtype=np.uint8)[left, letters]
+    letters = np.array(middle_rotor._backward_tables, dtype=np.uint8)[middle, letters]
+    letters = np.array(right_rotor._backward_tables, dtype=np.uint8)[right, letters]
+    return plugboard_table[letters], int(states[-1])
+
+
+def encipher_letters(
+    rotors: list[Rotor],
+    reflector: Reflector,
+    plugboard: Plugboard,
+    start: int,
+    letters: bytes,
+    compiled_table: Optional[bytes] = None,
+) -> tuple[bytes, int]:
+    # Encipher normalized letters as ASCII bytes (uppercase A-Z only), returning the ciphertext and the final state
+    encrypted = bytearray()
+    state = start
+    for offset in range(0, len(letters), VECTORIZED_BLOCK_SIZE):
+        indices = np.frombuffer(letters, dtype=np.uint8, count=min(VECTORIZED_BLOCK_SIZE, len(letters) - offset),
+                                offset=offset) - ord("A")
+        block, state = encipher_indices(rotors, reflector, plugboard, state, indices, compiled_table)
+        encrypted += (block + ord("A")).astype(np.uint8).tobytes()
+    logger.debug(f"Vectorized encipher of {len(letters)} letters")
+    return bytes(encrypted), state
+
+
+def encipher_table_letters(
+    middle_notches: str,
+    right_notches: str,
+    table: bytes,
+    plugboard_wiring: bytes,
+    start: int,
+    letters: bytes,
+) -> tuple[bytes, int]:
+    # Encipher normalized letters as ASCII bytes with a compiled scrambler table and plugboard wiring, returning
+    # the ciphertext and the final state. Works only on its arguments, so it is safe to call from many threads.
+    table_array = np.frombuffer(table, dtype=np.uint8)
+    plugboard_table = np.frombuffer(plugboard_wiring, dtype=np.uint8)
+    encrypted = bytearray()
+    state = start
+    for offset in range(0, len(letters), VECTORIZED_BLOCK_SIZE):
+        count = min(VECTORIZED_BLOCK_SIZE, len(letters) - offset)
+        indices = np.frombuffer(letters, dtype=np.uint8, count=count, offset=offset) - ord("A")
+        states = notch_state_sequence(middle_notches, right_notches, state, count)
+        block = plugboard_table[table_array[states * 26 + plugboard_table[indices]]]
+        encrypted += (block + ord("A")).astype(np.uint8).tobytes()
+        state = int(states[-1])
+    return bytes(encrypted), state
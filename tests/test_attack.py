@@ -0,0 +1,144 @@
+import heapq
+import pytest
+from pyenigma import attack
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma.attack import (
+    Candidate, PlugboardClimber, index_of_coincidence, ioc_sweep, keep_top, score_rotor_order, solve_plugboard
+)
+from pyenigma.batch import KeySpec, encipher_many
+from pyenigma.compiled import LETTER_TO_INDEX
+from pyenigma.exceptions import (
+    AttackInvalidMaxPairsException, AttackInvalidTopKException, AttackInvalidWorkersException,
+    PlugboardNothingToUndoException, RotorInvalidModelException
+)
+
+
+PLAINTEXT = (
+    "DERFUEHRERHATBEFOHLENDASSDIEARMEEGRUPPEMITTEIHREANGRIFFEFORTSETZTUNDDIESTELLUNGENAMFLUSSHAELTBISWEITERE"
+    "BEFEHLEEINTREFFENALLEEINHEITENMELDENSOFORTIHREVERLUSTEUNDDENSTANDDERMUNITIONANDASOBERKOMMANDO"
+)
+
+
+def encrypt(plaintext: str) -> str:
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor("II", "A", "K"), Rotor.get_rotor("V", "A", "D"), Rotor.get_rotor("III", "A", "Q")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+    return enigma.encipher(plaintext)
+
+
+CIPHERTEXT = encrypt(PLAINTEXT)
+
+
+def test_index_of_coincidence():
+    assert index_of_coincidence(b"AABB") == pytest.approx(4 / 12)
+    assert index_of_coincidence(b"ABCD") == 0.0
+    assert index_of_coincidence(b"A") == 0.0
+    assert index_of_coincidence(PLAINTEXT.encode("ascii")) > index_of_coincidence(CIPHERTEXT.encode("ascii"))
+
+
+def test_keep_top():
+    heap: list[Candidate] = []
+    key = KeySpec(("I", "II", "III"), "B")
+    for score in [0.3, 0.1, 0.5, 0.2, 0.4]:
+        keep_top(heap, Candidate(score, key), 3)
+    assert sorted(candidate.score for candidate in heap) == [0.3, 0.4, 0.5]
+    assert heapq.heappop(heap).score == 0.3
+
+
+def test_score_rotor_order_finds_key():
+    candidates = score_rotor_order(CIPHERTEXT.encode("ascii").translate(LETTER_TO_INDEX), ("II", "V", "III"), top_k=5)
+    assert len(candidates) == 5
+    assert candidates[0].key.positions == ("K", "D", "Q")
+    assert candidates[0].score == pytest.approx(index_of_coincidence(PLAINTEXT.encode("ascii")))
+    assert [candidate.score for candidate in candidates] == sorted((candidate.score for candidate in candidates), reverse=True)
+
+
+def test_score_rotor_order_pure_python_matches_numpy(monkeypatch: pytest.MonkeyPatch):
+    pytest.importorskip("numpy")
+    letters = CIPHERTEXT[:40].encode("ascii").translate(LETTER_TO_INDEX)
+    expected = score_rotor_order(letters, ("II", "V", "III"), top_k=5)
+    monkeypatch.setattr(attack, "HAS_NUMPY", False)
+    candidates = score_rotor_order(letters, ("II", "V", "III"), top_k=5)
+    assert [candidate.score for candidate in candidates] == [candidate.score for candidate in expected]
+    assert candidates[0].key == expected[0].key
+
+
+def test_score_rotor_order_invalid_top_k():
+    with pytest.raises(AttackInvalidTopKException):
+        score_rotor_order(CIPHERTEXT.encode("ascii").translate(LETTER_TO_INDEX), ("II", "V", "III"), top_k=0)
+    with pytest.raises(AttackInvalidTopKException):
+        ioc_sweep(CIPHERTEXT, orders=[("II", "V", "III")], top_k=0, workers=1)
+
+
+def test_ioc_sweep():
+    candidates = ioc_sweep(CIPHERTEXT, orders=[("I", "V", "III"), ("II", "V", "III")], top_k=3, workers=1)
+    assert len(candidates) == 3
+    assert candidates[0].key == KeySpec(("II", "V", "III"), "B", ("A", "A", "A"), ("K", "D", "Q"))
+
+
+def test_ioc_sweep_invalid_workers():
+    for workers in (0, -1):
+        with pytest.raises(AttackInvalidWorkersException):
+            ioc_sweep(CIPHERTEXT, orders=[("II", "V", "III")], workers=workers)
+
+
+def test_ioc_sweep_invalid_model():
+    with pytest.raises(RotorInvalidModelException):
+        ioc_sweep(CIPHERTEXT, orders=[("II", "V", "X")], workers=1)
+
+
+PLUGBOARD = "AV BS CG DL FU HZ IN KM OW RX"
+PLUGBOARD_KEY = KeySpec(("II", "V", "III"), "B", ("A", "A", "A"), ("K", "D", "Q"))
+
+
+def encrypt_plugged(plaintext: str) -> str:
+    return encipher_many([PLUGBOARD_KEY._replace(plugboard=PLUGBOARD)], [plaintext])[0]
+
+
+def test_climber_score_matches_index_of_coincidence():
+    ciphertext = encrypt_plugged(PLAINTEXT)
+    climber = PlugboardClimber(ciphertext, PLUGBOARD_KEY)
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(PLUGBOARD)
+    assert climber.score(plugboard) == pytest.approx(index_of_coincidence(PLAINTEXT.encode("ascii")))
+    assert climber.score(Plugboard()) == pytest.approx(index_of_coincidence(
+        encipher_many([PLUGBOARD_KEY], [ciphertext])[0].encode("ascii")))
+
+
+def test_climb_keeps_undo_empty():
+    climber = PlugboardClimber(encrypt_plugged(PLAINTEXT), PLUGBOARD_KEY)
+    plugboard = Plugboard()
+    score = climber.climb(plugboard, max_pairs=3)
+    assert score == pytest.approx(climber.score(plugboard))
+    assert len(plugboard.connections) <= 6
+    with pytest.raises(PlugboardNothingToUndoException):
+        plugboard.undo()
+
+
+def test_solve_plugboard():
+    candidate = solve_plugboard(encrypt_plugged(PLAINTEXT), PLUGBOARD_KEY, restarts=4, workers=1)
+    assert candidate.key == PLUGBOARD_KEY._replace(plugboard=PLUGBOARD)
+    assert candidate.score == pytest.approx(index_of_coincidence(PLAINTEXT.encode("ascii")))
+
+
+def test_solve_plugboard_is_repeatable():
+    ciphertext = encrypt_plugged(PLAINTEXT[:120])
+    assert solve_plugboard(ciphertext, PLUGBOARD_KEY, restarts=3, seed=5, workers=1) == \
+        solve_plugboard(ciphertext, PLUGBOARD_KEY, restarts=3, seed=5, workers=1)
+
+
+def test_solve_plugboard_without_pairs():
+    candidate = solve_plugboard(encrypt_plugged(PLAINTEXT), PLUGBOARD_KEY, restarts=3, max_pairs=0, workers=1)
+    assert candidate.key.plugboard == ""
+
+
+def test_solve_plugboard_invalid_settings():
+    ciphertext = encrypt_plugged(PLAINTEXT)
+    for max_pairs in (-1, 11, 13):
+        with pytest.raises(AttackInvalidMaxPairsException):
+            solve_plugboard(ciphertext, PLUGBOARD_KEY, restarts=3, max_pairs=max_pairs, workers=1)
+        with pytest.raises(AttackInvalidMaxPairsException):
+            PlugboardClimber(ciphertext, PLUGBOARD_KEY).restart(1, max_pairs)
+    with pytest.raises(AttackInvalidWorkersException):
+        solve_plugboard(ciphertext, PLUGBOARD_KEY, workers=0)
@@ -0,0 +1,60 @@
+import pytest
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma import batch
+from pyenigma.batch import KeySpec, encipher_many
+from pyenigma.exceptions import EnigmaMachineBatchSizeMismatchException, PlugboardConnectionExistsException
+
+
+KEYS = [
+    KeySpec(("I", "II", "III"), "B"),
+    KeySpec(("III", "IV", "I"), "B", ("L", "E", "T"), ("F", "R", "H"), "EM UG HT YI RF AJ"),
+    KeySpec(("I", "II", "III"), "B", positions=("A", "A", "U")),
+    KeySpec(("IV", "II", "I"), "C", ("H", "R", "Q"), ("L", "F", "P"), "HR QP FZ SW EU"),
+    KeySpec(("III", "IV", "I"), "B", ("L", "E", "T"), ("A", "B", "C"), "AB"),
+]
+MESSAGES = ["AAAAA", "HELLOWORLD", "AAA", "Hello World", "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG"]
+
+
+def encipher_with_machine(key: KeySpec, message: str) -> str:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(key.plugboard)
+    enigma = EnigmaMachine()
+    enigma.set_rotors([
+        Rotor.get_rotor(model, ring_setting, position)
+        for model, ring_setting, position in zip(key.rotors, key.ring_settings, key.positions)
+    ])
+    enigma.set_reflector(Reflector.get_reflector(key.reflector))
+    enigma.set_plugboard(plugboard)
+    return enigma.encipher(message)
+
+
+def test_encipher_many_known_values():
+    results = encipher_many(KEYS[:4], MESSAGES[:4])
+    assert results == ["BDZGO", "ZZASKXUKIH", "MUQ", "CTTOJBSHRV"]
+
+
+def test_encipher_many_matches_machine():
+    results = encipher_many(KEYS, MESSAGES)
+    assert results == [encipher_with_machine(key, message) for key, message in zip(KEYS, MESSAGES)]
+
+
+def test_encipher_many_full_table(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(batch, "FULL_TABLE_MIN_LETTERS", 0)
+    results = encipher_many(KEYS, MESSAGES)
+    assert results == [encipher_with_machine(key, message) for key, message in zip(KEYS, MESSAGES)]
+
+
+def test_encipher_many_is_reciprocal():
+    ciphertexts = encipher_many(KEYS, MESSAGES)
+    plaintexts = encipher_many(KEYS, ciphertexts)
+    assert plaintexts == [EnigmaMachine._normalize_message(message) for message in MESSAGES]
+
+
+def test_encipher_many_size_mismatch():
+    with pytest.raises(EnigmaMachineBatchSizeMismatchException):
+        encipher_many(KEYS, MESSAGES[:2])
+
+
+def test_encipher_many_validates_plugboard():
+    with pytest.raises(PlugboardConnectionExistsException):
+        encipher_many([KeySpec(("I", "II", "III"), "B", plugboard="AB AC")], ["HELLO"])
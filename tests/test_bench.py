@@ -0,0 +1,54 @@
+import json
+import sys
+import threading
+import pytest
+from pyenigma import cli
+from pyenigma.bench import BENCHMARKS, run_benchmarks
+from pyenigma.bench.runner import percentile
+
+
+def test_run_benchmarks_reports_each_size():
+    report = run_benchmarks(["encipher_compiled", "rotor_get_rotor"], sizes=[10, 100], min_time=0, max_repeats=3)
+    json.dumps(report)
+    results = [(result["name"], result["size"], result["repeats"]) for result in report["results"]]
+    assert results == [("encipher_compiled", 10, 1), ("encipher_compiled", 100, 1), ("rotor_get_rotor", None, 1)]
+    latency = report["results"][0]["latency"]
+    assert latency["min"] <= latency["p50"] <= latency["p99"] <= latency["max"]
+    assert report["results"][1]["chars_per_sec"] > 0
+
+
+def test_run_benchmarks_skips_sizes_above_max_size():
+    max_size = BENCHMARKS["path_per_letter"].max_size
+    assert max_size is not None
+    report = run_benchmarks(["path_per_letter"], sizes=[10, max_size + 1], min_time=0, max_repeats=1)
+    assert [result["size"] for result in report["results"]] == [10]
+    assert report["skipped"] == [{"name": "path_per_letter", "size": max_size + 1, "reason": "above max size"}]
+
+
+def test_every_benchmark_runs():
+    for name, bench in BENCHMARKS.items():
+        if bench.available:
+            call = bench.factory(100 if bench.sized else None)
+            call()
+            getattr(call, "close", lambda: None)()
+
+
+def test_thread_pool_is_shut_down():
+    before = threading.active_count()
+    run_benchmarks(["functional_threads"], sizes=[10, 100], min_time=0, max_repeats=2)
+    assert threading.active_count() == before
+
+
+def test_percentile():
+    times = [float(value) for value in range(1, 101)]
+    assert percentile(times, 0.5) == 50
+    assert percentile(times, 0.99) == 99
+    assert percentile([3.0], 0.9) == 3.0
+
+
+def test_cli_bench(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]):
+    monkeypatch.setattr(sys, "argv", ["pyenigma", "bench", "--benchmark", "reflector_get_reflector",
+                                      "--min-time", "0", "--max-repeats", "2"])
+    cli.main()
+    report = json.loads(capsys.readouterr().out)
+    assert [result["name"] for result in report["results"]] == ["reflector_get_reflector"]
@@ -0,0 +1,81 @@
+import pytest
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma.bombe import build_menu, rotor_orders, run_bombe, sweep_rotor_order
+from pyenigma.exceptions import (
+    BombeCribConflictException, BombeCribOutOfRangeException, BombeInvalidWorkersException, RotorInvalidModelException
+)
+
+
+PLUGBOARD = "AV BS CG DL FU HZ IN KM OW RX"
+CRIB = "WETTERVORHERSAGEBISKAYA"
+
+
+def encrypt(plaintext: str) -> str:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(PLUGBOARD)
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor("II", "A", "K"), Rotor.get_rotor("V", "A", "D"), Rotor.get_rotor("III", "A", "Q")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(plugboard)
+    return enigma.encipher(plaintext)
+
+
+CIPHERTEXT = encrypt("XXX" + CRIB + "XXXUNDSONSTNICHTSNEUES")
+
+
+def test_build_menu():
+    menu = build_menu("QWERTY", "ab", 2)
+    assert [(edge.plain, edge.cipher, edge.position) for edge in menu.edges] == [(0, 4, 2), (1, 17, 3)]
+
+    menu = build_menu(CIPHERTEXT, CRIB, 3)
+    assert len(menu.edges) == len(CRIB)
+    degrees = [sum(letter in (edge.plain, edge.cipher) for edge in menu.edges) for letter in range(26)]
+    assert degrees[menu.test_letter] == max(degrees)
+
+
+def test_build_menu_out_of_range():
+    with pytest.raises(BombeCribOutOfRangeException):
+        build_menu("QWERTY", "ABC", 4)
+    with pytest.raises(BombeCribOutOfRangeException):
+        build_menu("QWERTY", "ABC", -1)
+    with pytest.raises(BombeCribOutOfRangeException):
+        build_menu("QWERTY", "", 0)
+
+
+def test_build_menu_conflict():
+    # An Enigma Machine never enciphers a letter to itself
+    with pytest.raises(BombeCribConflictException):
+        build_menu("QWERTY", "AE", 1)
+
+
+def test_rotor_orders():
+    orders = rotor_orders()
+    assert len(orders) == 60
+    assert len(set(orders)) == 60
+    assert rotor_orders(["I", "II", "III"])[0] == ("I", "II", "III")
+
+
+def test_sweep_rotor_order_finds_key():
+    pytest.importorskip("numpy")
+    stops = sweep_rotor_order(build_menu(CIPHERTEXT, CRIB, 3), ("II", "V", "III"))
+    assert [stop.positions for stop in stops] == [("K", "D", "Q")]
+    pairs = {frozenset(pair) for pair in PLUGBOARD.split()}
+    for letter, plugged in stops[0].steckers:
+        assert letter == plugged or frozenset(letter + plugged) in pairs
+
+
+def test_run_bombe():
+    pytest.importorskip("numpy")
+    stops = run_bombe(CIPHERTEXT, CRIB, 3, orders=[("II", "V", "III"), ("I", "V", "III")], workers=1)
+    assert [(stop.rotors, stop.positions) for stop in stops] == [(("II", "V", "III"), ("K", "D", "Q"))]
+
+
+def test_run_bombe_invalid_model():
+    with pytest.raises(RotorInvalidModelException):
+        run_bombe(CIPHERTEXT, CRIB, 3, orders=[("II", "V", "X")], workers=1)
+
+
+def test_run_bombe_invalid_workers():
+    for workers in (0, -1):
+        with pytest.raises(BombeInvalidWorkersException):
+            run_bombe(CIPHERTEXT, CRIB, 3, orders=[("II", "V", "III")], workers=workers)
@@ -0,0 +1,20 @@
+import sys
+import pytest
+from pyenigma import cli
+
+
+ARGS = ["pyenigma", "--rotors", "I", "II", "III", "--reflector", "B", "--message", "AAAAA"]
+
+
+def test_cli_encipher(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]):
+    monkeypatch.setattr(sys, "argv", ARGS + ["--workers", "2"])
+    cli.main()
+    assert capsys.readouterr().out == "BDZGO\n"
+
+
+def test_cli_rejects_workers_below_one(monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]):
+    for workers in ("0", "-1"):
+        monkeypatch.setattr(sys, "argv", ARGS + ["--workers", workers])
+        with pytest.raises(SystemExit):
+            cli.main()
+        assert "--workers: must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,59 @@
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma.compiled import COMPILED_TABLE_CACHE, CompiledTableCache, scrambler_config_key
+
+
+def build_machine(plugboard_connections: str = "AV BS CG", position: str = "A") -> EnigmaMachine:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(plugboard_connections)
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_II("B", position), Rotor.get_rotor_IV("C"), Rotor.get_rotor_V("D")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(plugboard)
+    return enigma
+
+
+def test_compiled_table_cache_hits_misses_and_evictions():
+    cache = CompiledTableCache(maxsize=2)
+    assert cache.get("a", lambda: b"1") == b"1"
+    assert cache.get("b", lambda: b"2") == b"2"
+    assert cache.get("a", lambda: b"unused") == b"1"
+    # "b" is the least recently used, so it is evicted
+    assert cache.get("c", lambda: b"3") == b"3"
+    assert cache.get("b", lambda: b"4") == b"4"
+    assert cache.stats() == {"hits": 1, "misses": 4, "evictions": 2, "size": 2, "maxsize": 2}
+
+    cache.resize(1)
+    assert len(cache) == 1
+    cache.clear()
+    assert cache.stats() == {"hits": 0, "misses": 0, "evictions": 0, "size": 0, "maxsize": 1}
+
+
+def test_scrambler_config_key_ignores_positions_and_plugboard():
+    enigma = build_machine("AV BS CG")
+    same = build_machine("QR", position="Q")
+    other = build_machine("AV BS CG")
+    other.set_rotors([Rotor.get_rotor_II("C"), Rotor.get_rotor_IV("C"), Rotor.get_rotor_V("D")])
+    key = scrambler_config_key(enigma.rotors, enigma.reflector)
+    assert key == scrambler_config_key(same.rotors, same.reflector)
+    assert key != scrambler_config_key(other.rotors, other.reflector)
+    hash(key)
+
+
+def test_fresh_machine_reuses_compiled_table():
+    COMPILED_TABLE_CACHE.clear()
+    enigma = build_machine()
+    enigma.compile()
+    # A machine with other plugboard connections shares the table too
+    fresh = build_machine("QR XY")
+    fresh.compile()
+    assert fresh._compiled_table is enigma._compiled_table
+    assert COMPILED_TABLE_CACHE.stats()["hits"] == 1
+    assert COMPILED_TABLE_CACHE.stats()["misses"] == 1
+    assert fresh.encipher("HELLOWORLD") == build_machine("QR XY").encipher("HELLOWORLD")
+    assert enigma.encipher("HELLOWORLD") == build_machine().encipher("HELLOWORLD")
+
+
+def test_cache_lookup_reports_hits():
+    cache = CompiledTableCache()
+    assert cache.lookup("a", lambda: b"table") == (b"table", False)
+    assert cache.lookup("a", lambda: b"other") == (b"table", True)
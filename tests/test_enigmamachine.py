@@ -1,4 +1,18 @@
+import io
+import logging
+import pathlib
+import pytest
 from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma.compiled import COMPILED_TABLE_CACHE
+from pyenigma.exceptions import (
+    EnigmaMachineBufferTooSmallException,
+    EnigmaMachineInvalidChunkSizeException,
+    EnigmaMachineInvalidOffsetException,
+    EnigmaMachineInvalidStateException,
+    EnigmaMachineInvalidWorkersException,
+    EnigmaMachineSameFileException,
+    PlugboardNothingToUndoException
+)
 
 
 def test_enigma_machine_no_plugboard_default_settings_same_letter():
@@ -232,3 +246,426 @@ def test_enigma_machine_reset():
 
     encrypted = enigma.encipher("AAAAA")
     assert encrypted == "BDZGO"
+
+
+def test_enigma_machine_compiled_all_settings_configured():
+    rotorIII = Rotor.get_rotor_III("L", "F")
+    rotorIV = Rotor.get_rotor_IV("E", "R")
+    rotorI = Rotor.get_rotor_I("T", "H")
+    reflectorB = Reflector.get_reflector_B()
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("EM UG HT YI RF AJ")
+
+    enigma = EnigmaMachine()
+    enigma.set_rotors([rotorIII, rotorIV, rotorI])
+    enigma.set_reflector(reflectorB)
+    enigma.set_plugboard(plugboard)
+    enigma.compile()
+    assert enigma.is_compiled
+
+    encrypted = enigma.encipher("HELLOWORLD")
+    assert encrypted == "ZZASKXUKIH"
+
+    enigma.reset()
+    assert enigma.decipher(encrypted) == "HELLOWORLD"
+
+
+def test_enigma_machine_compiled_double_rotor_step():
+    rotorI = Rotor.get_rotor_I("A", "B")
+    rotorII = Rotor.get_rotor_II("A", "D")
+    rotorIII = Rotor.get_rotor_III("A", "U")
+
+    enigma = EnigmaMachine()
+    enigma.set_rotors([rotorI, rotorII, rotorIII])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+    enigma.compile()
+
+    assert enigma.encipher("AAA") == "WRL"
+    assert [rotor.rotor_position for rotor in enigma.rotors] == ["C", "F", "X"]
+
+
+def test_enigma_machine_compiled_relabels_after_plugboard_change():
+    plugboard = Plugboard()
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I(), Rotor.get_rotor_II(), Rotor.get_rotor_III()])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(plugboard)
+    enigma.compile()
+
+    plugboard.add_connection("A", "B")
+    assert enigma.encipher("BBBBB") == "ADZGO"
+
+
+def test_enigma_machine_set_component_clears_compiled_table():
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I(), Rotor.get_rotor_II(), Rotor.get_rotor_III()])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+    enigma.compile()
+
+    enigma.set_reflector(Reflector.get_reflector_C())
+    assert not enigma.is_compiled
+
+
+def test_enigma_machine_set_plugboard_keeps_compiled_table():
+    enigma = build_default_machine()
+    enigma.compile()
+    table = enigma._compiled_table
+
+    plugboard = Plugboard()
+    plugboard.add_connection("A", "B")
+    enigma.set_plugboard(plugboard)
+    assert enigma._compiled_table is table
+    assert enigma.encipher("BBBBB") == "ADZGO"
+
+
+def test_enigma_machine_state_at():
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I("A", "A"), Rotor.get_rotor_II("A", "D"), Rotor.get_rotor_III("A", "U")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+
+    assert enigma.state_at(0) == ("A", "D", "U")
+    assert enigma.state_at(1) == ("A", "D", "V")
+    assert enigma.state_at(2) == ("A", "E", "W")
+    assert enigma.state_at(3) == ("B", "F", "X")
+
+
+def test_enigma_machine_seek_matches_serial_encipher():
+    rotorIII = Rotor.get_rotor_III("L", "F")
+    rotorIV = Rotor.get_rotor_IV("E", "R")
+    rotorI = Rotor.get_rotor_I("T", "H")
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("EM UG HT YI RF AJ")
+
+    enigma = EnigmaMachine()
+    enigma.set_rotors([rotorIII, rotorIV, rotorI])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(plugboard)
+
+    message = "THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG" * 800
+    encrypted = enigma.encipher(message)
+
+    for offset in (0, 1, 25, 677, 16900, 17000, len(message) - 5):
+        enigma.seek(offset)
+        assert enigma.encipher(message[offset:offset + 5]) == encrypted[offset:offset + 5]
+
+
+def test_enigma_machine_state_at_negative_offset():
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I(), Rotor.get_rotor_II(), Rotor.get_rotor_III()])
+    with pytest.raises(EnigmaMachineInvalidOffsetException):
+        enigma.state_at(-1)
+
+
+def test_enigma_machine_encipher_parallel_matches_serial():
+    def build() -> EnigmaMachine:
+        plugboard = Plugboard()
+        plugboard.add_connection_from_string("EM UG HT YI RF AJ")
+        enigma = EnigmaMachine()
+        enigma.set_rotors([Rotor.get_rotor_III("L", "F"), Rotor.get_rotor_II("E", "D"), Rotor.get_rotor_I("T", "H")])
+        enigma.set_reflector(Reflector.get_reflector_B())
+        enigma.set_plugboard(plugboard)
+        return enigma
+
+    message = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG. " * 500
+    serial = build()
+    parallel = build()
+
+    assert parallel.encipher_parallel(message, workers=3, chunk_size=4000) == serial.encipher(message)
+    assert [rotor.rotor_position for rotor in parallel.rotors] == [rotor.rotor_position for rotor in serial.rotors]
+
+
+def test_enigma_machine_encipher_parallel_short_message_runs_serially():
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I(), Rotor.get_rotor_II(), Rotor.get_rotor_III()])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+
+    assert enigma.encipher_parallel("AAAAA", workers=4) == "BDZGO"
+
+
+def test_enigma_machine_encipher_parallel_invalid_settings():
+    enigma = build_default_machine()
+    with pytest.raises(EnigmaMachineInvalidChunkSizeException):
+        enigma.encipher_parallel("AAAAA", workers=2, chunk_size=0)
+    with pytest.raises(EnigmaMachineInvalidChunkSizeException):
+        enigma.encipher_parallel("AAAAA", workers=2, chunk_size=-1)
+    with pytest.raises(EnigmaMachineInvalidWorkersException):
+        enigma.encipher_parallel("AAAAA", workers=0)
+    assert enigma.encipher("AAAAA") == "BDZGO"
+
+
+def test_enigma_machine_encipher_chunks():
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I("A", "A"), Rotor.get_rotor_II("A", "A"), Rotor.get_rotor_III("A", "A")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+
+    chunks = enigma.encipher_chunks(["AA", "", "A A", "A!"])
+    assert list(chunks) == ["BD", "", "ZG", "O"]
+
+
+def test_enigma_machine_encipher_stream():
+    rotors = [Rotor.get_rotor_III("L", "F"), Rotor.get_rotor_IV("E", "R"), Rotor.get_rotor_I("T", "H")]
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("EM UG HT YI RF AJ")
+    enigma = EnigmaMachine()
+    enigma.set_rotors(rotors)
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(plugboard)
+
+    message = "The quick brown fox jumps over the lazy dog. " * 50
+    expected = enigma.encipher(message)
+    enigma.reset()
+
+    output = io.StringIO()
+    written = enigma.encipher_stream(io.StringIO(message), output, chunk_size=7)
+    assert output.getvalue() == expected
+    assert written == len(expected)
+
+
+def test_enigma_machine_encipher_stream_invalid_chunk_size():
+    enigma = build_default_machine()
+    for chunk_size in (0, -1):
+        with pytest.raises(EnigmaMachineInvalidChunkSizeException):
+            enigma.encipher_stream(io.StringIO("AAAAA"), io.StringIO(), chunk_size=chunk_size)
+
+
+def build_default_machine() -> EnigmaMachine:
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_I("A", "A"), Rotor.get_rotor_II("A", "A"), Rotor.get_rotor_III("A", "A")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+    return enigma
+
+
+def test_enigma_machine_encipher_into():
+    enigma = build_default_machine()
+    output = bytearray(16)
+    written = enigma.encipher_into(memoryview(b"aa a\naa!\xff"), output)
+    assert written == 5
+    assert output[:written] == b"BDZGO"
+
+    enigma.reset()
+    assert enigma.encipher_into(output[:written], output) == 5
+    assert output[:5] == b"AAAAA"
+
+
+def test_enigma_machine_encipher_into_many_blocks():
+    message = b"The quick brown fox jumps over the lazy dog.\n" * 5000
+    expected = build_default_machine().encipher(message.decode("ascii")).encode("ascii")
+
+    enigma = build_default_machine()
+    source = bytearray(message)
+    written = enigma.encipher_into(source, source)
+    assert source[:written] == expected
+
+
+def test_enigma_machine_encipher_into_buffer_too_small():
+    enigma = build_default_machine()
+    with pytest.raises(EnigmaMachineBufferTooSmallException):
+        enigma.encipher_into(b"AAAAA", bytearray(4))
+    output = bytearray(3)
+    assert enigma.encipher_into(b"A A A!", output) == 3
+    assert output == b"BDZ"
+
+
+def test_enigma_machine_encipher_file(tmp_path: pathlib.Path):
+    message = b"The quick brown fox jumps over the lazy dog.\n" * 100
+    expected = build_default_machine().encipher(message.decode("ascii"))
+    src = tmp_path / "plain.txt"
+    dst = tmp_path / "cipher.txt"
+    src.write_bytes(message)
+
+    enigma = build_default_machine()
+    assert enigma.encipher_file(str(src), str(dst), chunk_size=100) == len(expected)
+    assert dst.read_bytes() == expected.encode("ascii")
+
+
+def test_enigma_machine_encipher_file_warns_once(tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture):
+    src = tmp_path / "plain.txt"
+    dst = tmp_path / "cipher.txt"
+    src.write_bytes(b"AAAA!\n" * 100)
+    with caplog.at_level(logging.WARNING, logger="pyenigma"):
+        assert build_default_machine().encipher_file(str(src), str(dst), chunk_size=10) == 400
+    assert [record.getMessage() for record in caplog.records] == [
+        "Removed 200 invalid characters from message ('!': 100, '\\n': 100)"]
+
+
+def test_enigma_machine_encipher_file_into_itself(tmp_path: pathlib.Path):
+    src = tmp_path / "plain.txt"
+    src.write_bytes(b"AAAAA")
+    with pytest.raises(EnigmaMachineSameFileException):
+        build_default_machine().encipher_file(str(src), str(tmp_path / "." / "plain.txt"))
+    assert src.read_bytes() == b"AAAAA"
+
+
+def test_enigma_machine_encipher_file_invalid_chunk_size(tmp_path: pathlib.Path):
+    src = tmp_path / "plain.txt"
+    src.write_bytes(b"AAAAA")
+    for chunk_size in (0, -1):
+        with pytest.raises(EnigmaMachineInvalidChunkSizeException):
+            build_default_machine().encipher_file(str(src), str(tmp_path / "cipher.txt"), chunk_size=chunk_size)
+
+
+def test_enigma_machine_encipher_empty_file(tmp_path: pathlib.Path):
+    src = tmp_path / "plain.txt"
+    dst = tmp_path / "cipher.txt"
+    src.write_bytes(b"")
+    assert build_default_machine().encipher_file(str(src), str(dst)) == 0
+    assert dst.read_bytes() == b""
+
+
+def test_enigma_machine_does_not_log_per_letter(caplog: pytest.LogCaptureFixture):
+    enigma = build_default_machine()
+    with caplog.at_level(logging.DEBUG, logger="pyenigma"):
+        assert enigma.encipher("AAAAA") == "BDZGO"
+    assert not caplog.records
+
+
+def test_enigma_machine_trace_mode(caplog: pytest.LogCaptureFixture):
+    enigma = build_default_machine()
+    enigma.compile()
+    enigma.set_trace(True)
+    with caplog.at_level(logging.DEBUG, logger="pyenigma"):
+        assert enigma.encipher("AAAAA") == "BDZGO"
+    messages = [record.getMessage() for record in caplog.records]
+    assert "Starting encryption of letter A, rotor positions AAB" in messages
+    assert "Reflector reflected letter F to S" in messages
+    assert "Encrypted letter A to O" in messages
+
+
+def test_enigma_machine_stats_disabled_by_default():
+    enigma = build_default_machine()
+    enigma.encipher("AAAAA")
+    assert enigma.stats() is None
+
+
+def test_enigma_machine_stats_counts_steps():
+    rotorI = Rotor.get_rotor_I("A", "B")
+    rotorII = Rotor.get_rotor_II("A", "D")
+    rotorIII = Rotor.get_rotor_III("A", "U")
+
+    enigma = EnigmaMachine()
+    enigma.set_rotors([rotorI, rotorII, rotorIII])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+    batches = []
+    enigma.set_stats(True, batches.append)
+
+    assert enigma.encipher("A A A!") == "WRL"
+    stats = enigma.stats()
+    assert stats is not None
+    assert stats["letters"] == 3
+    assert stats["batches"] == 1
+    assert stats["middle_steps"] == 1
+    assert stats["double_steps"] == 1
+    assert stats["paths"]["per_letter"] == 1
+    assert stats["normalize_time"] > 0
+    assert [(batch["path"], batch["letters"]) for batch in batches] == [("per_letter", 3)]
+
+
+def test_enigma_machine_stats_compile_cache_hits_and_misses():
+    COMPILED_TABLE_CACHE.clear()
+    enigma = build_default_machine()
+    enigma.set_stats(True)
+    enigma.compile()
+    enigma.compile()
+
+    stats = enigma.stats()
+    assert stats is not None
+    assert stats["compiles"] == 2
+    assert stats["compile_cache_misses"] == 1
+    assert stats["compile_cache_hits"] == 1
+
+
+def test_enigma_machine_stats_plugboard_reuses_and_relabels():
+    enigma = build_default_machine()
+    enigma.set_stats(True)
+    enigma.compile()
+    enigma.encipher("AAAAA")
+    enigma.plugboard.add_connection("A", "B")
+    enigma.encipher("AAAAA")
+    enigma.encipher("AAAAA")
+
+    stats = enigma.stats()
+    assert stats is not None
+    # The plugboard change only rebuilds the plugboard tables, it does not recompile
+    assert stats["compiles"] == 1
+    assert stats["compile_time"] > 0
+    assert stats["compile_cache_hits"] + stats["compile_cache_misses"] == 1
+    assert stats["plugboard_reuses"] == 2
+    assert stats["plugboard_relabels"] == 1
+    assert stats["paths"]["compiled"] == 3
+    assert stats["letters"] == 15
+
+    enigma.reset_stats()
+    stats = enigma.stats()
+    assert stats is not None
+    assert stats["letters"] == 0
+    assert stats["compiles"] == 0
+
+
+def test_enigma_machine_get_and_set_state():
+    enigma = build_default_machine()
+    enigma.plugboard.add_connection("A", "B")
+    enigma.encipher("HELLO")
+    state = enigma.get_state()
+    assert len(state) == 29
+    assert state[:3] == (0, 0, 5)
+    assert state[3:6] == (1, 0, 2)
+    expected = enigma.encipher("WORLD")
+
+    # Branch off with other settings, then back out
+    enigma.plugboard.add_connection("C", "D")
+    enigma.encipher("SOMETHINGELSE")
+    enigma.set_state(state)
+    assert enigma.plugboard.connections == {"A": "B", "B": "A"}
+    assert enigma.encipher("WORLD") == expected
+
+
+def test_enigma_machine_set_state_clears_plugboard_undo():
+    enigma = build_default_machine()
+    state = enigma.get_state()
+    enigma.plugboard.swap("A", "B")
+    enigma.set_state(state)
+    with pytest.raises(PlugboardNothingToUndoException):
+        enigma.plugboard.undo()
+    assert enigma.plugboard.connections == {}
+
+
+def test_enigma_machine_set_state_invalid_length():
+    enigma = build_default_machine()
+    with pytest.raises(EnigmaMachineInvalidStateException):
+        enigma.set_state((0, 0, 0))
+
+
+def test_enigma_machine_set_state_invalid_values():
+    enigma = build_default_machine()
+    state = enigma.get_state()
+    one_way = list(state)
+    one_way[3] = 1
+    eleven_pairs = list(state[:3]) + [index ^ 1 if index < 22 else index for index in range(26)]
+    for invalid in ((26, 0, 0) + state[3:], (0, -1, 0) + state[3:], tuple(one_way), (0, 0, 0, 26) + state[4:],
+                    tuple(eleven_pairs)):
+        with pytest.raises(EnigmaMachineInvalidStateException):
+            enigma.set_state(invalid)
+    assert enigma.get_state() == state
+
+
+def test_components_use_slots():
+    enigma = build_default_machine()
+    for component in (enigma, enigma.rotors[0], enigma.reflector, enigma.plugboard):
+        assert not hasattr(component, "__dict__")
+
+
+def test_enigma_machine_compiled_follows_plugboard_swaps():
+    enigma = build_default_machine()
+    enigma.compile()
+    enigma.plugboard.swap("A", "B")
+    assert enigma.encipher("BBBBB") == "ADZGO"
+    enigma.plugboard.undo()
+    enigma.reset()
+    assert enigma.encipher("AAAAA") == "BDZGO"
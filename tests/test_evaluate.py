@@ -0,0 +1,92 @@
+import pytest
+from pyenigma.batch import KeySpec, encipher_many
+from pyenigma.evaluate import PrunedEvaluator, evaluate_keys
+from pyenigma.exceptions import AttackInvalidTopKException
+from pyenigma.ngrams import NgramModel
+from pyenigma.stats import PruneStats
+
+
+CORPUS = (
+    "The weather report for the coast is calm seas and a light westerly wind in the morning, with fog later in "
+    "the day. All units are to report their positions at the start of the next watch and to hold the line along "
+    "the river until further orders arrive from the command post. Supplies of fuel and ammunition are to be "
+    "checked and reported to the quartermaster before the end of the day."
+)
+PLAINTEXT = "All units are to report their positions and hold the line along the river until orders arrive" * 2
+KEY = KeySpec(("II", "V", "III"), "B", ("A", "A", "A"), ("K", "D", "Q"), "AV BS CG DL FU")
+WRONG_KEYS = [KEY._replace(positions=("K", "D", letter)) for letter in "ABCDEFGHIJ"]
+MODEL = NgramModel.build([CORPUS], 3)
+CIPHERTEXT = encipher_many([KEY], [PLAINTEXT])[0]
+
+
+def full_score(key: KeySpec) -> float:
+    plaintext = encipher_many([key], [CIPHERTEXT])[0]
+    return MODEL.score(plaintext) / (len(plaintext) - 2)
+
+
+def test_score_matches_full_decryption():
+    evaluator = PrunedEvaluator(CIPHERTEXT, MODEL, checkpoints=(10, 25, 60))
+    assert evaluator.ends == [10, 25, 60, len(CIPHERTEXT)]
+    for key in [KEY] + WRONG_KEYS[:3]:
+        assert evaluator.score(key) == pytest.approx(full_score(key))
+
+
+def test_checkpoints_past_the_end_are_ignored():
+    assert PrunedEvaluator("HELLO", MODEL, checkpoints=(3, 5, 100)).ends == [3, 5]
+    assert PrunedEvaluator("HI", MODEL).score(KEY) == 0.0
+
+
+def test_evaluate_keys_without_pruning():
+    candidates = evaluate_keys(CIPHERTEXT, WRONG_KEYS + [KEY], MODEL)
+    assert len(candidates) == len(WRONG_KEYS) + 1
+    assert candidates[0].key == KEY
+    assert [candidate.score for candidate in candidates] == sorted((c.score for c in candidates), reverse=True)
+
+
+def test_threshold_prunes_wrong_keys():
+    stats = PruneStats()
+    candidates = evaluate_keys(CIPHERTEXT, WRONG_KEYS + [KEY], MODEL, threshold=-4.0, checkpoints=(25, 50), stats=stats)
+    assert [candidate.key for candidate in candidates] == [KEY]
+
+    snapshot = stats.snapshot()
+    assert snapshot["evaluated"] == len(WRONG_KEYS) + 1
+    assert snapshot["completed"] == 1
+    assert snapshot["pruned"] == len(WRONG_KEYS)
+    assert snapshot["letters"] == 25 * len(WRONG_KEYS) + len(CIPHERTEXT)
+    assert snapshot["letters_saved"] == (len(CIPHERTEXT) - 25) * len(WRONG_KEYS)
+    first = snapshot["checkpoints"][25]
+    assert first["reached"] == len(WRONG_KEYS) + 1
+    assert first["pruned"] == len(WRONG_KEYS)
+    assert first["score_min"] <= first["score_mean"] <= first["score_max"]
+    assert first["score_stdev"] > 0
+    assert snapshot["checkpoints"][len(CIPHERTEXT)]["reached"] == 1
+
+
+def test_top_k_bound_prunes_after_a_good_key():
+    stats = PruneStats()
+    candidates = evaluate_keys(CIPHERTEXT, [KEY] + WRONG_KEYS, MODEL, top_k=1, stats=stats)
+    assert [candidate.key for candidate in candidates] == [KEY]
+    assert stats.pruned == len(WRONG_KEYS)
+
+
+def test_evaluate_keys_invalid_top_k():
+    with pytest.raises(AttackInvalidTopKException):
+        evaluate_keys(CIPHERTEXT, [KEY], MODEL, top_k=0)
+
+
+def test_prune_stats_reset():
+    stats = PruneStats()
+    evaluate_keys(CIPHERTEXT, WRONG_KEYS, MODEL, stats=stats)
+    assert stats.snapshot()["completed"] == len(WRONG_KEYS)
+    stats.reset()
+    assert stats.snapshot() == {
+        "evaluated": 0, "completed": 0, "pruned": 0, "letters": 0, "letters_saved": 0, "checkpoints": {},
+    }
+
+
+def test_checkpoints_shorter_than_an_ngram():
+    model = NgramModel.build([CORPUS], 4)
+    expected = PrunedEvaluator(CIPHERTEXT, model, checkpoints=()).score(WRONG_KEYS[0])
+    assert PrunedEvaluator(CIPHERTEXT, model, checkpoints=(2, 4, 6)).score(WRONG_KEYS[0]) == pytest.approx(expected)
+    assert PrunedEvaluator(CIPHERTEXT, model, checkpoints=range(1, 20)).score(KEY) == pytest.approx(
+        PrunedEvaluator(CIPHERTEXT, model, checkpoints=()).score(KEY))
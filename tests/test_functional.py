@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma import functional, vectorized
+from pyenigma.batch import KeySpec
+from pyenigma.functional import compile_config, positions_to_state, state_to_positions
+from pyenigma.exceptions import RotorInvalidModelException
+
+
+KEY = KeySpec(("III", "IV", "I"), "B", ("L", "E", "T"), ("F", "R", "H"), "EM UG HT YI RF AJ")
+
+
+def build_machine(key: KeySpec) -> EnigmaMachine:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string(key.plugboard)
+    enigma = EnigmaMachine()
+    enigma.set_rotors([
+        Rotor.get_rotor(model, ring_setting, position)
+        for model, ring_setting, position in zip(key.rotors, key.ring_settings, key.positions)
+    ])
+    enigma.set_reflector(Reflector.get_reflector(key.reflector))
+    enigma.set_plugboard(plugboard)
+    return enigma
+
+
+def test_encipher_known_value():
+    config, state = compile_config(KeySpec(("IV", "II", "I"), "C", ("H", "R", "Q"), ("L", "F", "P"), "HR QP FZ SW EU"))
+    encrypted, end_state = functional.encipher(config, "Hello World", state)
+    assert encrypted == "CTTOJBSHRV"
+    assert state_to_positions(end_state) == ("L", "G", "Z")
+
+
+def test_encipher_matches_machine():
+    config, state = compile_config(KEY)
+    message = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG" * 20
+    enigma = build_machine(KEY)
+    encrypted, end_state = functional.encipher(config, message, state)
+    assert encrypted == enigma.encipher(message)
+    assert end_state == enigma.functional_state()
+
+
+def test_encipher_continues_from_end_state():
+    config, state = compile_config(KEY)
+    first, middle_state = functional.encipher(config, "HELLO", state)
+    second, end_state = functional.encipher(config, "WORLD", middle_state)
+    assert (first + second, end_state) == functional.encipher(config, "HELLOWORLD", state)
+    assert functional.decipher(config, first + second, state)[0] == "HELLOWORLD"
+
+
+def test_encipher_long_message_matches_short_path(monkeypatch: pytest.MonkeyPatch):
+    config, state = compile_config(KEY)
+    message = "THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG" * 100
+    expected = functional.encipher(config, message, state)
+    monkeypatch.setattr(vectorized, "VECTORIZED_MIN_LENGTH", len(message) + 1)
+    assert functional.encipher(config, message, state) == expected
+
+
+def test_encipher_shared_config_across_threads():
+    config, state = compile_config(KEY)
+    messages = [f"MESSAGE NUMBER {number} " * (number + 1) for number in range(40)]
+    expected = [functional.encipher(config, message, state) for message in messages]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda message: functional.encipher(config, message, state), messages))
+    assert results == expected
+
+
+def test_machine_to_config():
+    config, state = compile_config(KEY)
+    enigma = build_machine(KEY)
+    assert enigma.to_config() == config
+    assert enigma.functional_state() == state == positions_to_state(KEY.positions)
+
+
+def test_compile_config_validates_key():
+    with pytest.raises(RotorInvalidModelException):
+        compile_config(KeySpec(("I", "II", "IX"), "B"))
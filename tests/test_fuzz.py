@@ -533,6 +533,42 @@ class TestEnigmaMachineFuzz:
             f"Reset did not restore state: {result1!r} != {result2!r}"
         )
 
+    @given(
+        r1=rotor_model, r2=rotor_model, r3=rotor_model,
+        ref=reflector_model,
+        rs1=uppercase_letter, rs2=uppercase_letter, rs3=uppercase_letter,
+        p1=uppercase_letter, p2=uppercase_letter, p3=uppercase_letter,
+        message=alpha_message,
+    )
+    @settings(max_examples=50, deadline=None, suppress_health_check=[HealthCheck.too_slow])
+    def test_compiled_matches_uncompiled(
+        self, r1: str, r2: str, r3: str, ref: str,
+        rs1: str, rs2: str, rs3: str,
+        p1: str, p2: str, p3: str,
+        message: str,
+    ) -> None:
+        """The compiled table must produce exactly the same ciphertext and final rotor
+        positions as the per-letter path."""
+        pairs = [("A", "Z"), ("Q", "M"), ("E", "T")]
+        machine1 = build_machine(
+            rotor_models=(r1, r2, r3),
+            reflector_model=ref,
+            ring_settings=(rs1, rs2, rs3),
+            positions=(p1, p2, p3),
+            plugboard_pairs=pairs,
+        )
+        machine2 = build_machine(
+            rotor_models=(r1, r2, r3),
+            reflector_model=ref,
+            ring_settings=(rs1, rs2, rs3),
+            positions=(p1, p2, p3),
+            plugboard_pairs=pairs,
+        )
+        machine2.compile()
+
+        assert machine1.encipher(message) == machine2.encipher(message)
+        assert [r.rotor_position for r in machine1.rotors] == [r.rotor_position for r in machine2.rotors]
+
     def test_encipher_empty_string(self) -> None:
         """Enciphering an empty string should produce an empty string."""
         machine = build_machine()
@@ -0,0 +1,126 @@
+import pickle
+import random
+import pytest
+from pyenigma import ngrams
+from pyenigma.compiled import LETTER_TO_INDEX
+from pyenigma.ngrams import NgramModel, count_ngrams, main
+from pyenigma.exceptions import NgramInvalidFileException, NgramInvalidOrderException
+
+
+CORPUS = (
+    "The quick brown fox jumps over the lazy dog. The weather report for the coast is calm seas and a light "
+    "westerly wind. All units are to report their positions at the start of the next watch."
+)
+
+
+def indices(text: str) -> bytes:
+    return text.encode("ascii").translate(LETTER_TO_INDEX)
+
+
+def test_count_ngrams():
+    counts = count_ngrams(["AB A-B"], 2)
+    assert counts[0 * 26 + 1] == 2
+    assert counts[1 * 26 + 0] == 1
+    assert sum(counts) == 3
+
+
+def test_count_ngrams_across_texts():
+    assert count_ngrams(["ABC", "D", "", "EF"], 3) == count_ngrams(["ABCDEF"], 3)
+
+
+def test_from_counts():
+    counts = [0] * 26
+    counts[0] = 3
+    counts[1] = 1
+    model = NgramModel.from_counts(counts, 1)
+    assert model.score("A") == pytest.approx(-0.1249387)
+    assert model.score("C") == pytest.approx(model.floor)
+    assert model.floor == pytest.approx(-2.60206)
+
+
+def test_invalid_order():
+    with pytest.raises(NgramInvalidOrderException):
+        NgramModel.build([CORPUS], 0)
+    with pytest.raises(NgramInvalidOrderException):
+        count_ngrams([CORPUS], ngrams.MAX_NGRAM_ORDER + 1)
+    with pytest.raises(NgramInvalidOrderException):
+        NgramModel.from_counts([1] * 26, 2)
+
+
+def test_score_paths_agree(monkeypatch):
+    model = NgramModel.build([CORPUS], 3)
+    text = indices("THEWEATHERREPORTFORTHECOASTISCALMSEASANDALIGHTWESTERLYWINDALLUNITSAREALERT")
+    expected = model.score_indices(text)
+    monkeypatch.setattr(ngrams, "NGRAM_VECTORIZED_MIN_LENGTH", 10 ** 6)
+    assert model.score_indices(text) == pytest.approx(expected)
+    assert model.score_indices(indices("AB")) == 0.0
+
+
+def test_english_scores_higher_than_random():
+    model = NgramModel.build([CORPUS], 2)
+    letters = "".join(random.Random(0).choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(40))
+    assert model.score("the coast is calm at the start of the watch") > model.score(letters)
+
+
+def test_score_batch():
+    model = NgramModel.build([CORPUS], 4)
+    texts = [indices("THEQUICKBROWNFOX"), indices("ABC"), b"", indices("REPORTTHEIRPOSITIONS" * 5)]
+    assert model.score_batch(texts) == pytest.approx([model.score_indices(text) for text in texts])
+    assert model.score_batch([]) == []
+
+
+def test_score_array():
+    np = pytest.importorskip("numpy")
+    model = NgramModel.build([CORPUS], 2)
+    texts = [indices("THEQUICKBROWNFOX"), indices("REPORTPOSITIONSX")]
+    scores = model.score_array(np.array([np.frombuffer(text, dtype=np.uint8) for text in texts]))
+    assert list(scores) == pytest.approx([model.score_indices(text) for text in texts])
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / "trigrams.bin")
+    model = NgramModel.build([CORPUS], 3)
+    model.save(path)
+    loaded = NgramModel.load(path)
+    assert loaded.n == 3
+    assert loaded.path == path
+    assert loaded.floor == pytest.approx(model.floor)
+    assert loaded.score(CORPUS) == pytest.approx(model.score(CORPUS))
+
+    # A loaded model pickles as its path, so worker processes map the file again
+    assert len(pickle.dumps(loaded)) < 1_000
+    assert pickle.loads(pickle.dumps(loaded)).score(CORPUS) == pytest.approx(model.score(CORPUS))
+    assert pickle.loads(pickle.dumps(model)).score(CORPUS) == pytest.approx(model.score(CORPUS))
+
+
+def test_load_invalid(tmp_path):
+    path = tmp_path / "table.bin"
+    path.write_bytes(b"")
+    with pytest.raises(NgramInvalidFileException):
+        NgramModel.load(str(path))
+    path.write_bytes(b"NOTATABLE" * 10)
+    with pytest.raises(NgramInvalidFileException):
+        NgramModel.load(str(path))
+
+    NgramModel.build([CORPUS], 2).save(str(path))
+    path.write_bytes(path.read_bytes()[:-4])
+    with pytest.raises(NgramInvalidFileException):
+        NgramModel.load(str(path))
+
+
+def test_main(tmp_path, capsys):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_text(CORPUS)
+    output = tmp_path / "bigrams.bin"
+    main([str(corpus), "-n", "2", "--output", str(output)])
+    assert "2-grams" in capsys.readouterr().out
+    assert NgramModel.load(str(output)).score(CORPUS) == pytest.approx(NgramModel.build([CORPUS], 2).score(CORPUS))
+
+
+def test_count_ngrams_short_texts_match_pure_python(monkeypatch):
+    texts = ["AB", "CD", "EFGHIJ", "K", "LM", "", "N", "OPQ"]
+    expected = count_ngrams(["".join(texts)], 4)
+    assert sum(expected) == len("".join(texts)) - 3
+    assert count_ngrams(texts, 4) == expected
+    monkeypatch.setattr(ngrams, "HAS_NUMPY", False)
+    assert count_ngrams(texts, 4) == expected
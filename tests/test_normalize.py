@@ -0,0 +1,50 @@
+import logging
+from collections import Counter
+import pytest
+from pyenigma.normalize import normalize_bytes, normalize_message, log_removed
+
+
+def test_normalize_uppercases_and_strips():
+    assert normalize_message("Hello, World! 123") == "HELLOWORLD"
+
+
+def test_normalize_unchanged_message():
+    assert normalize_message("HELLOWORLD") == "HELLOWORLD"
+
+
+def test_normalize_non_ascii():
+    assert normalize_message("Grüße aus Köln") == "GRSSEAUSKLN"
+
+
+def test_normalize_counts_removed_characters():
+    removed: Counter[str] = Counter()
+    assert normalize_message("A1B1C.D É", removed) == "ABCD"
+    assert normalize_message("E!", removed) == "E"
+    assert removed == Counter({"1": 2, ".": 1, "É": 1, "!": 1})
+
+
+def test_normalize_warns_per_character(caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.WARNING, logger="pyenigma.normalize"):
+        normalize_message("A1B1 C")
+    assert [record.getMessage() for record in caplog.records] == ["Removing invalid character 1 from message"] * 2
+
+
+def test_normalize_does_not_warn_when_counting(caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.WARNING, logger="pyenigma.normalize"):
+        normalize_message("A1B1C", Counter())
+    assert not caplog.records
+
+
+def test_log_removed_single_summary(caplog: pytest.LogCaptureFixture):
+    with caplog.at_level(logging.WARNING, logger="pyenigma.normalize"):
+        log_removed(Counter({"1": 2, ".": 1}))
+        log_removed(Counter())
+    assert [record.getMessage() for record in caplog.records] == [
+        "Removed 3 invalid characters from message ('1': 2, '.': 1)"
+    ]
+
+
+def test_normalize_bytes():
+    removed: Counter[str] = Counter()
+    assert normalize_bytes(b"Hello, World!\xff", removed) == b"HELLOWORLD"
+    assert removed == Counter({",": 1, "!": 1, "\xff": 1})
@@ -1,6 +1,7 @@
 import pytest
 from pyenigma import Plugboard
 from pyenigma.exceptions import PlugboardConnectionExistsException, PlugboardConnectionToItselfException, PlugboardInvalidLetterException, PlugboardStringOddNumberOfLettersException, PlugboardTooManyConnectionsException
+from pyenigma.exceptions import PlugboardLetterNotConnectedException, PlugboardNothingToUndoException
 
 
 def test_plugboard_translates_first_letter():
@@ -86,3 +87,86 @@ def test_plugboard_add_connections_from_string_with_odd_number_of_characters():
     plugboard = Plugboard()
     with pytest.raises(PlugboardStringOddNumberOfLettersException):
         plugboard.add_connection_from_string("ABC")
+
+
+def test_plugboard_swap_and_unswap():
+    plugboard = Plugboard()
+    plugboard.swap("A", "B")
+    assert plugboard.connections == {"A": "B", "B": "A"}
+    plugboard.unswap("B")
+    assert plugboard.connections == {}
+
+    with pytest.raises(PlugboardLetterNotConnectedException):
+        plugboard.unswap("A")
+    with pytest.raises(PlugboardInvalidLetterException):
+        plugboard.unswap("1")
+
+
+def test_plugboard_replace_pair():
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("AB CD")
+    plugboard.replace_pair("B", "A", "E")
+    assert plugboard.connections == {"A": "E", "E": "A", "C": "D", "D": "C"}
+
+    # A failed replacement leaves the connections as they were
+    with pytest.raises(PlugboardConnectionExistsException):
+        plugboard.replace_pair("A", "C", "F")
+    assert plugboard.connections == {"A": "E", "E": "A", "C": "D", "D": "C"}
+
+
+def test_plugboard_replace_pair_at_connection_limit():
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("AB CD EF GH IJ KL MN OP QR ST")
+    plugboard.replace_pair("A", "U", "V")
+    assert plugboard.translate("U") == "V"
+    assert plugboard.translate("A") == "A"
+    with pytest.raises(PlugboardTooManyConnectionsException):
+        plugboard.swap("W", "X")
+
+
+def test_plugboard_undo():
+    plugboard = Plugboard()
+    plugboard.add_connection("A", "B")
+    plugboard.swap("C", "D")
+    plugboard.replace_pair("A", "A", "E")
+    plugboard.unswap("C")
+
+    plugboard.undo()
+    assert plugboard.connections == {"A": "E", "E": "A", "C": "D", "D": "C"}
+    plugboard.undo()
+    plugboard.undo()
+    assert plugboard.connections == {"A": "B", "B": "A"}
+    # add_connection is not recorded for undo
+    with pytest.raises(PlugboardNothingToUndoException):
+        plugboard.undo()
+
+
+def test_plugboard_clear_undo():
+    plugboard = Plugboard()
+    plugboard.swap("A", "B")
+    plugboard.clear_undo()
+    with pytest.raises(PlugboardNothingToUndoException):
+        plugboard.undo()
+    assert plugboard.translate("A") == "B"
+
+
+def test_plugboard_translation_tables():
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("AB YZ")
+    assert b"ABCXYZ abc".translate(plugboard.translation_table()) == b"BACXZY abc"
+    assert plugboard.wiring()[:3] == bytes([1, 0, 2])
+    assert plugboard.wiring()[24:] == bytes([25, 24])
+
+
+def test_plugboard_trusted_constructors():
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("AB YZ")
+    from_pairs = Plugboard.from_pairs([(0, 1), (24, 25)])
+    assert from_pairs.connections == plugboard.connections
+    from_wiring = Plugboard.from_wiring(plugboard.wiring())
+    assert from_wiring.connections == plugboard.connections
+
+    # The connection count carries over, so the limit still applies to later connections
+    full = Plugboard.from_pairs((index, index + 1) for index in range(0, 20, 2))
+    with pytest.raises(PlugboardTooManyConnectionsException):
+        full.add_connection("U", "V")
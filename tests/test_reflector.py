@@ -110,3 +110,20 @@ def test_get_reflector_by_name():
 def test_get_reflector_invalid_model():
     with pytest.raises(ReflectorInvalidModelException):
         Reflector.get_reflector("D")
+
+
+def test_reflectors_share_wiring_map():
+    assert Reflector.get_reflector_B()._wiring_map is Reflector.get_reflector("B")._wiring_map
+    assert Reflector.get_reflector_C()._wiring_map is not Reflector.get_reflector_B()._wiring_map
+
+
+def test_reflector_wiring_map_is_read_only():
+    reflector = Reflector.get_reflector_B()
+    with pytest.raises(TypeError):
+        reflector._wiring_map["A"] = "A"  # type: ignore[index]
+    assert Reflector.get_reflector_B().reflect("A") == "Y"
+
+
+def test_reflector_trusted_constructors():
+    assert Reflector.from_model("B").reflect("A") == "Y"
+    assert Reflector.trusted(Reflector.get_reflector_C()._wiring).reflect("A") == "F"
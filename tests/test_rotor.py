@@ -427,6 +427,34 @@ def test_rotate_rotor_I_A_B():
     assert rotor.rotor_position == "C"
     assert rotor.pass_forward("A") == "K"
 
+
+def test_rotate_wraps_around():
+    rotor = Rotor.get_rotor_I("A", "Z")
+    rotor.rotate()
+    assert rotor.rotor_position == "A"
+    assert rotor.pass_forward("A") == "E"
+
+
+def test_set_rotor_position():
+    rotor = Rotor.get_rotor_I("A", "A")
+    rotor.rotor_position = "B"
+    assert rotor.pass_forward("A") == "J"
+
+
+### Test integer index passes ###
+
+
+def test_pass_forward_index_matches_letters():
+    rotor = Rotor.get_rotor_I("F", "Y")
+    for index, letter in enumerate("ABCDEFGHIJKLMNOPQRSTUVWXYZ"):
+        assert "ABCDEFGHIJKLMNOPQRSTUVWXYZ"[rotor.pass_forward_index(index)] == rotor.pass_forward(letter)
+
+
+def test_pass_backward_index_inverts_forward():
+    rotor = Rotor.get_rotor_III("L", "C")
+    for index in range(26):
+        assert rotor.pass_backward_index(rotor.pass_forward_index(index)) == index
+
 ## Test rotor reset ##
 
 
@@ -493,6 +521,20 @@ def test_get_rotor_invalid_model():
     with pytest.raises(RotorInvalidModelException):
         Rotor.get_rotor("VI", "A", "A")
 
+
+def test_rotors_share_tables():
+    rotor1 = Rotor.get_rotor_I("B", "A")
+    rotor2 = Rotor.get_rotor("I", "B", "Q")
+    assert rotor1._forward_tables is rotor2._forward_tables
+    assert rotor1._backward_tables is rotor2._backward_tables
+    assert Rotor.get_rotor_I("C")._forward_tables is not rotor1._forward_tables
+
+    # Each rotor keeps its own position
+    rotor1.rotate()
+    assert rotor1.rotor_position == "B"
+    assert rotor2.rotor_position == "Q"
+
+
 ## Test rotor exceptions ##
 
 
@@ -506,6 +548,18 @@ def test_rotor_wiring_duplicate_letters_exception():
         Rotor("AACDEFGHIJKLMNOPQRSTUVWXYZ", "A")
 
 
+def test_rotor_invalid_setting_exception():
+    with pytest.raises(RotorInvalidLetterException):
+        Rotor.get_rotor_I("a", "A")
+
+    # Invalid settings are not cached, so they raise every time
+    with pytest.raises(RotorInvalidLetterException):
+        Rotor.get_rotor_I("a", "A")
+
+    with pytest.raises(RotorInvalidLetterException):
+        Rotor.get_rotor_I("A", "1")
+
+
 def test_rotor_invalid_letter_exception():
     with pytest.raises(RotorInvalidLetterException):
         Rotor("ABCDEF5HIJKLMNOPQRSTUVWXYZ", "A")
@@ -515,3 +569,16 @@ def test_rotor_invalid_letter_exception():
 
     with pytest.raises(RotorInvalidLetterException):
         Rotor("ABCDEFgHIJKLMNOPQRSTUVWXYZ", "A")
+
+
+def test_rotor_trusted_constructors_match_get_rotor():
+    expected = Rotor.get_rotor("IV", "C", "Q")
+    for rotor in (Rotor.from_indices("IV", 2, 16), Rotor.trusted(expected._wiring, expected.notch, 2, 16, "IV")):
+        assert rotor._forward_tables is expected._forward_tables
+        assert rotor._ring_setting == "C"
+        assert rotor.rotor_position == "Q"
+        assert rotor.notch == expected.notch
+        assert rotor._rotor_model == "IV"
+        rotor.rotate()
+        rotor.reset()
+        assert rotor.rotor_position == "Q"
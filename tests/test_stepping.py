@@ -0,0 +1,100 @@
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma.constants import ALPHABET, ROTOR_NOTCHES
+from pyenigma.stepping import STATE_COUNT, state_id, state_positions, stepping_schedule, stepping_table
+
+
+def walk_rotors(rotors: list[Rotor], presses: int) -> list[int]:
+    # Step the rotor objects the same way EnigmaMachine.encipher does, recording the state after each press
+    enigma = EnigmaMachine()
+    enigma.set_rotors(rotors)
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(Plugboard())
+    states = []
+    for _ in range(presses):
+        enigma.encipher("A")
+        states.append(state_id(*(ALPHABET.index(rotor.rotor_position) for rotor in rotors)))
+    return states
+
+
+def test_state_id_round_trip():
+    for state in (0, 1, 26, 676, STATE_COUNT - 1, 12345):
+        assert state_id(*state_positions(state)) == state
+    assert state_id(25, 25, 25) == STATE_COUNT - 1
+
+
+def test_stepping_table_right_rotor_steps():
+    table = stepping_table(ROTOR_NOTCHES["II"], ROTOR_NOTCHES["III"])
+    assert table[state_id(0, 0, 0)] == state_id(0, 0, 1)
+    assert table[state_id(0, 0, 25)] == state_id(0, 0, 0)
+
+
+def test_stepping_table_middle_rotor_steps():
+    # Rotor III turns the middle rotor over when stepping from V to W
+    table = stepping_table(ROTOR_NOTCHES["II"], ROTOR_NOTCHES["III"])
+    assert table[state_id(0, 0, ALPHABET.index("V"))] == state_id(0, 1, ALPHABET.index("W"))
+
+
+def test_stepping_table_double_step():
+    # Rotor II turns the left rotor over when stepping from E to F, and steps itself again on the next press
+    table = stepping_table(ROTOR_NOTCHES["II"], ROTOR_NOTCHES["III"])
+    assert table[state_id(0, ALPHABET.index("E"), 0)] == state_id(1, ALPHABET.index("F"), 1)
+
+
+def test_stepping_table_matches_rotor_stepping():
+    rotors = [Rotor.get_rotor_I("A", "A"), Rotor.get_rotor_II("A", "D"), Rotor.get_rotor_III("A", "U")]
+    table = stepping_table(rotors[1].notch, rotors[2].notch)
+    state = state_id(0, ALPHABET.index("D"), ALPHABET.index("U"))
+    for expected in walk_rotors(rotors, 2000):
+        state = table[state]
+        assert state == expected
+
+
+def test_stepping_table_multiple_notches():
+    # Rotors VI to VIII have notches before both A and N
+    rotors = [
+        Rotor.get_rotor_I("A", "A"),
+        Rotor("JPGVOUMFYQBENHZRDKASXLICTW", "AN", "A", "L"),
+        Rotor("NZJHGRCXMYSWBOUFAIVLPEKQDT", "AN", "A", "K"),
+    ]
+    table = stepping_table("AN", "AN")
+    state = state_id(0, ALPHABET.index("L"), ALPHABET.index("K"))
+    states = walk_rotors(rotors, 1000)
+    for expected in states:
+        state = table[state]
+        assert state == expected
+    # Both of the right rotor's notches turn the middle rotor over
+    assert table[state_id(0, 0, ALPHABET.index("M"))] == state_id(0, 1, ALPHABET.index("N"))
+    assert table[state_id(0, 0, ALPHABET.index("Z"))] == state_id(0, 1, ALPHABET.index("A"))
+
+
+def test_stepping_schedule_advance_matches_table_walk():
+    table = stepping_table(ROTOR_NOTCHES["IV"], ROTOR_NOTCHES["V"])
+    schedule = stepping_schedule(ROTOR_NOTCHES["IV"], ROTOR_NOTCHES["V"])
+    # Start off the cycle, with the middle rotor waiting to double step
+    start = state_id(3, ALPHABET.index("J"), 7)
+    state = start
+    for presses in range(40000):
+        assert schedule.advance(start, presses) == state
+        state = table[state]
+
+
+def test_stepping_schedule_single_notch_period():
+    schedule = stepping_schedule(ROTOR_NOTCHES["II"], ROTOR_NOTCHES["III"])
+    assert [len(cycle) for cycle in schedule.cycles] == [26 * 25 * 26]
+
+
+def test_stepping_schedule_step_counts_match_table_walk():
+    table = stepping_table(ROTOR_NOTCHES["IV"], ROTOR_NOTCHES["V"])
+    schedule = stepping_schedule(ROTOR_NOTCHES["IV"], ROTOR_NOTCHES["V"])
+    start = state_id(3, ALPHABET.index("J"), 7)
+    state = start
+    middle_steps = double_steps = 0
+    for presses in range(40000):
+        if presses % 997 == 0:
+            assert schedule.step_counts(start, presses) == (middle_steps, double_steps)
+        following = table[state]
+        if following // 676 != state // 676:
+            double_steps += 1
+        elif following // 26 != state // 26:
+            middle_steps += 1
+        state = following
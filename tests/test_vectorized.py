@@ -0,0 +1,84 @@
+import pytest
+from pyenigma import EnigmaMachine, Rotor, Reflector, Plugboard
+from pyenigma import vectorized
+from pyenigma.constants import ALPHABET
+from pyenigma.stepping import state_id, stepping_table
+
+np = pytest.importorskip("numpy")
+
+
+def build_machine() -> EnigmaMachine:
+    plugboard = Plugboard()
+    plugboard.add_connection_from_string("EM UG HT YI RF AJ")
+    enigma = EnigmaMachine()
+    enigma.set_rotors([Rotor.get_rotor_III("L", "F"), Rotor.get_rotor_II("E", "D"), Rotor.get_rotor_I("T", "H")])
+    enigma.set_reflector(Reflector.get_reflector_B())
+    enigma.set_plugboard(plugboard)
+    return enigma
+
+
+def serial_encipher(enigma: EnigmaMachine, message: str, monkeypatch: pytest.MonkeyPatch) -> str:
+    with monkeypatch.context() as patch:
+        patch.setattr(vectorized, "VECTORIZED_MIN_LENGTH", len(message) + 1)
+        return enigma.encipher(message)
+
+
+def test_state_sequence_matches_stepping_table():
+    rotors = [Rotor.get_rotor_I(), Rotor.get_rotor_II(), Rotor.get_rotor_III()]
+    table = stepping_table(rotors[1].notch, rotors[2].notch)
+    # Start with the middle rotor waiting to double step
+    start = state_id(0, ALPHABET.index("E"), 3)
+    states = vectorized.state_sequence(rotors, start, 20000)
+    state = start
+    for expected in states:
+        state = table[state]
+        assert state == expected
+
+
+def test_encipher_indices_matches_serial(monkeypatch: pytest.MonkeyPatch):
+    message = "THEQUICKBROWNFOXJUMPSOVERTHELAZYDOG" * 100
+    expected = serial_encipher(build_machine(), message, monkeypatch)
+
+    enigma = build_machine()
+    indices = np.frombuffer(message.encode("ascii"), dtype=np.uint8) - ord("A")
+    encrypted, state = vectorized.encipher_indices(enigma.rotors, enigma.reflector, enigma.plugboard, enigma._state_id(), indices)
+    assert bytes(encrypted + ord("A")).decode("ascii") == expected
+    assert state == state_id(*(ALPHABET.index(position) for position in enigma.state_at(len(message))))
+
+
+def test_long_message_uses_vectorized_backend(monkeypatch: pytest.MonkeyPatch):
+    message = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG " * 200
+    serial = build_machine()
+    expected = serial_encipher(serial, message, monkeypatch)
+
+    enigma = build_machine()
+    calls = []
+    original = vectorized.encipher_letters
+
+    def counting_encipher_letters(*args: object) -> tuple[bytes, int]:
+        calls.append(args)
+        return original(*args)  # type: ignore[arg-type]
+
+    monkeypatch.setattr(vectorized, "encipher_letters", counting_encipher_letters)
+    assert enigma.encipher(message) == expected
+    assert calls
+    assert [rotor.rotor_position for rotor in enigma.rotors] == [rotor.rotor_position for rotor in serial.rotors]
+
+
+def test_long_message_compiled_vectorized(monkeypatch: pytest.MonkeyPatch):
+    message = "THE QUICK BROWN FOX JUMPS OVER THE LAZY DOG " * 200
+    expected = serial_encipher(build_machine(), message, monkeypatch)
+
+    enigma = build_machine()
+    enigma.compile()
+    assert enigma.encipher(message) == expected
+
+
+def test_vectorized_blocks_match_single_block(monkeypatch: pytest.MonkeyPatch):
+    message = (ALPHABET * 200)[:5000]
+    reference = build_machine()
+    expected = reference.encipher(message)
+    monkeypatch.setattr(vectorized, "VECTORIZED_BLOCK_SIZE", 777)
+    enigma = build_machine()
+    assert enigma.encipher(message) == expected
+    assert enigma._state_id() == reference._state_id()